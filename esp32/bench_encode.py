@@ -0,0 +1,50 @@
+# bench_encode.py
+# Commentarii Latine: probatio in machina: encode_bytes contra LineEncoder, per nuntium.
+# Run on the ESP32 (mpremote run bench_encode.py); no hardware needed.
+import gc
+import time
+
+import ndjson_prefix as ndj
+
+N = 500
+
+SENSOR = {
+    "type": "sensor",
+    "ts_ms": 123789,
+    "distance_mm": 412,
+    "tilt": {"pitch_rad": -0.412213736, "roll_rad": 1.969741821},
+    "accel_g": {"x": 0.40185548, "y": 0.8491211, "z": -0.3564453},
+    "gyro_dps": {"x": -1.526718, "y": 0.6030534, "z": -0.2595420},
+    "temp_c": 36.43529,
+}
+BUTTON = {"type": "button", "ts_ms": 123790, "event": "press"}
+DECIMALS = {"tilt": 4, "accel_g": 4, "gyro_dps": 2, "temp_c": 2}
+
+
+def _measure(label, fn, obj):
+    gc.collect()
+    gc.disable()
+    a0 = gc.mem_alloc()
+    t0 = time.ticks_us()
+    for _ in range(N):
+        fn(obj)
+    us = time.ticks_diff(time.ticks_us(), t0)
+    a1 = gc.mem_alloc()
+    gc.enable()
+    print("%-24s %7.1f B/msg %7.1f us/msg" % (label, (a1 - a0) / N, us / N))
+
+
+def main():
+    # Interface default: one C json.dumps, plus the newline.
+    plain = lambda o: ndj.encode_bytes(o) + b"\n"
+    # SENSORS_REUSE_PAYLOAD / NDJSON_DECIMALS: Python walker into one buffer.
+    walker = ndj.LineEncoder(newline=True).encode
+    # NDJSON_DECIMALS example from pins_io: fixed-point digits written in place.
+    fixed = ndj.LineEncoder(newline=True, decimals=DECIMALS).encode
+    for name, obj in (("sensor", SENSOR), ("button", BUTTON)):
+        _measure(name + " encode_bytes", plain, obj)
+        _measure(name + " LineEncoder", walker, obj)
+        _measure(name + " LineEncoder+dec", fixed, obj)
+
+
+main()
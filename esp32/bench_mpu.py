@@ -0,0 +1,42 @@
+# bench_mpu.py
+# Commentarii Latine: probatio in machina: bytes in acervo per lectionem MPU.
+# Run on the ESP32 (mpremote run bench_mpu.py); needs the MPU wired as in pins_io.
+# read()/tilt() = old path, read_into()/tilt_into() = new; no board results recorded yet.
+import gc
+import time
+
+import pins_io
+import gyro_sensor as gs
+
+N = 500
+
+
+def _measure(label, fn):
+    gc.collect()
+    gc.disable()
+    a0 = gc.mem_alloc()
+    t0 = time.ticks_us()
+    for _ in range(N):
+        fn()
+    us = time.ticks_diff(time.ticks_us(), t0)
+    a1 = gc.mem_alloc()
+    gc.enable()
+    print("%-12s %7.1f B/sample %7.1f us/sample" % (label, (a1 - a0) / N, us / N))
+
+
+def main():
+    mpu = gs.MPUSensor(
+        i2c_id=pins_io.MPU_I2C_ID,
+        sda_pin=pins_io.MPU_SDA_PIN,
+        scl_pin=pins_io.MPU_SCL_PIN,
+        freq=pins_io.MPU_I2C_FREQ,
+        addr=pins_io.MPU_ADDR,
+    )
+    out = gs.imu_array()
+    _measure("read()", mpu.read)
+    _measure("tilt()", mpu.tilt)
+    _measure("read_into()", lambda: mpu.read_into(out))
+    _measure("tilt_into()", lambda: mpu.tilt_into(out))
+
+
+main()
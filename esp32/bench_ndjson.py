@@ -0,0 +1,40 @@
+# bench_ndjson.py
+# Commentarii Latine: probatio in machina: try_parse_line (et parse_payload) pro lineis congruentibus et alienis.
+# Run on the ESP32 (mpremote run bench_ndjson.py); no hardware needed.
+import gc
+import time
+
+import ndjson_prefix as ndj
+
+N = 1000
+
+MATCH = b'@MUSE#J={"cmd":"relay","id":0,"value":1,"timeout_s":900}'
+NOISE = b"I (12345) wifi:station: aa:bb:cc:dd:ee:ff join, AID=1, bgn, 40U"
+NEAR = b"@MUSE#X=" + MATCH[8:]   # prefix mismatch in the last byte
+MATCH_MV = memoryview(b"  " + MATCH + b"\r\n")[2:-2]
+
+
+def _measure(label, line, f=ndj.try_parse_line):
+    gc.collect()
+    gc.disable()
+    a0 = gc.mem_alloc()
+    t0 = time.ticks_us()
+    for _ in range(N):
+        f(line)
+    us = time.ticks_diff(time.ticks_us(), t0)
+    a1 = gc.mem_alloc()
+    gc.enable()
+    print("%-14s %7.1f B/line %7.1f us/line" % (label, (a1 - a0) / N, us / N))
+
+
+def main():
+    _measure("match bytes", MATCH)
+    _measure("match mview", MATCH_MV)
+    _measure("payload mview", MATCH_MV[8:], ndj.parse_payload)   # UART: LineBuffer matched the prefix
+    _measure("match str", MATCH.decode())
+    _measure("noise bytes", NOISE)
+    _measure("near bytes", NEAR)
+    _measure("noise str", NOISE.decode())
+
+
+main()
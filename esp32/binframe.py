@@ -0,0 +1,102 @@
+# binframe.py
+# Commentarii Latine: nuntius sensorius in forma binaria compacta (optio, per UDP).
+import struct
+
+BIN_PREFIX = b"@MUSE#B="
+BIN_VERSION = 1
+
+# Little-endian, fixed layout after the prefix (28 bytes, 36 with prefix):
+#   B version, B flags, I ts_ms, H dist0_mm, H dist1_mm,
+#   h pitch, h roll, h ax, h ay, h az, h gx, h gy, h gz, h temp
+BIN_FMT = "<BBIHHhhhhhhhhh"
+BIN_SIZE = struct.calcsize(BIN_FMT)
+
+# flags
+F_DIST0 = 0x01
+F_DIST1 = 0x02
+F_IMU = 0x04      # tilt/accel/gyro present
+F_TEMP = 0x08
+
+DIST_NONE = 0xFFFF
+
+# Fixed-point scales (value = int / scale). Ranges fit the MPU config
+# (±2 g, ±250 dps) with room for bias; tilt covers ±π.
+SCALE_RAD = 10000     # 0.1 mrad
+SCALE_G = 10000       # 0.1 mg, ±3.27 g
+SCALE_DPS = 100       # 0.01 dps, ±327 dps
+SCALE_C = 100         # 0.01 °C
+
+
+def _i16(v, scale):
+    v = int(round(v * scale))
+    return 32767 if v > 32767 else (-32768 if v < -32768 else v)
+
+
+def _mm(v):
+    if v is None:
+        return DIST_NONE
+    v = int(v)
+    return 0 if v < 0 else (DIST_NONE - 1 if v >= DIST_NONE else v)
+
+
+class BinEncoder:
+    """
+    Packs a Sensors.read() payload (default field names) into one
+    preallocated frame. Only "sensor" messages have a binary form; encode()
+    returns None for anything else, which then goes out as NDJSON. Two
+    distance slots: the first two ToF sensors (or the single one).
+    """
+
+    def __init__(self):
+        n = len(BIN_PREFIX)
+        self.buf = bytearray(n + BIN_SIZE)
+        self.buf[:n] = BIN_PREFIX
+        self._off = n
+        self.frames = 0
+
+    def encode(self, obj):
+        if obj.get("type") != "sensor":
+            return None
+        flags = 0
+        d = obj.get("distance_mm")
+        if isinstance(d, list):
+            d0 = d[0] if len(d) > 0 else None
+            d1 = d[1] if len(d) > 1 else None
+        else:
+            d0, d1 = d, None
+        if d0 is not None:
+            flags |= F_DIST0
+        if d1 is not None:
+            flags |= F_DIST1
+
+        t = obj.get("tilt")
+        a = obj.get("accel_g")
+        g = obj.get("gyro_dps")
+        pitch = roll = ax = ay = az = gx = gy = gz = 0
+        try:
+            pitch = _i16(t["pitch_rad"], SCALE_RAD)
+            roll = _i16(t["roll_rad"], SCALE_RAD)
+            ax = _i16(a["x"], SCALE_G)
+            ay = _i16(a["y"], SCALE_G)
+            az = _i16(a["z"], SCALE_G)
+            gx = _i16(g["x"], SCALE_DPS)
+            gy = _i16(g["y"], SCALE_DPS)
+            gz = _i16(g["z"], SCALE_DPS)
+            flags |= F_IMU
+        except Exception:
+            pitch = roll = ax = ay = az = gx = gy = gz = 0
+
+        temp = obj.get("temp_c")
+        tc = 0
+        if temp is not None:
+            tc = _i16(temp, SCALE_C)
+            flags |= F_TEMP
+
+        struct.pack_into(
+            BIN_FMT, self.buf, self._off,
+            BIN_VERSION, flags, int(obj.get("ts_ms", 0)) & 0xFFFFFFFF,
+            _mm(d0), _mm(d1),
+            pitch, roll, ax, ay, az, gx, gy, gz, tc,
+        )
+        self.frames += 1
+        return self.buf
@@ -8,6 +8,7 @@ from interface import Interface
 from sensors import Sensors
 from outputs import Outputs
 from button import Button
+from clocksync import clock
 
 # esp32 standalone demo / hardware check.
 DEMO_MODE = True
@@ -68,8 +69,11 @@ def main():
     while True:
         outputs.tick()
 
+        sensors.poll()
         if sensors.due():
-            iface.emit(sensors.read())
+            msg = sensors.read()
+            if sensors.changed(msg):
+                iface.emit(msg)
 
         evt = button.tick()
         if evt:
@@ -78,11 +82,19 @@ def main():
         if not DEMO: 
             for msg in iface.poll_messages():
                 if isinstance(msg, dict) and "cmd" in msg:
-                    ok = outputs.handle_cmd(msg)
+                    ok = (
+                        clock.handle_cmd(msg, iface.emit)
+                        or iface.handle_cmd(msg)
+                        or sensors.handle_cmd(msg, iface.emit)
+                        or outputs.handle_cmd(msg)
+                    )
                     if not ok:
                         iface.emit({"type": "warn", "what": "unknown_cmd", "msg": msg})
         else:
-            _ = iface.poll_messages()  # drain only
+            # drain only; clock sync still answered so the host can sync during the demo
+            for msg in iface.poll_messages():
+                if isinstance(msg, dict):
+                    clock.handle_cmd(msg, iface.emit)
 
             now = time.ticks_ms()
             dt = time.ticks_diff(now, demo_t0)
@@ -109,6 +121,8 @@ def main():
                 DEMO = False
 
         now = time.ticks_ms()
+        clock.poll(now)
+        iface.tick(now)
         if time.ticks_diff(now, last_yield) >= 5:
             last_yield = now
             time.sleep_ms(1)
@@ -0,0 +1,61 @@
+# calstore.py
+# Commentarii Latine: parva tabula calibrationum in flash (JSON), clavibus sensorum.
+import json
+
+try:
+    import os
+except ImportError:
+    import uos as os
+
+import pins_io
+
+CAL_FILE_DEFAULT = "cal.json"
+
+
+def _path(path):
+    return path or getattr(pins_io, "CAL_FILE", CAL_FILE_DEFAULT)
+
+
+def _load_all(path=None):
+    try:
+        with open(_path(path)) as f:
+            d = json.load(f)
+        return d if isinstance(d, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_all(d, path=None):
+    # Write + rename, so a power cut mid-write never leaves half a file.
+    p = _path(path)
+    tmp = p + ".tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(d, f)
+        try:
+            os.rename(tmp, p)
+        except OSError:
+            # FAT will not rename over an existing file.
+            os.remove(p)
+            os.rename(tmp, p)
+        return True
+    except Exception:
+        return False
+
+
+def load(key, path=None):
+    return _load_all(path).get(key)
+
+
+def save(key, data, path=None):
+    d = _load_all(path)
+    d[key] = data
+    return _save_all(d, path)
+
+
+def clear(key, path=None):
+    d = _load_all(path)
+    if key not in d:
+        return True
+    del d[key]
+    return _save_all(d, path)
@@ -0,0 +1,130 @@
+# clocksync.py
+# Commentarii Latine: horologium machinae cum horologio hospitis concordat (NTP modo).
+import time
+
+import pins_io
+
+# Offset fits closer together than this do not update the drift estimate;
+# a few ms of Wi-Fi jitter over a short span would look like huge drift.
+DRIFT_MIN_SPAN_S = 60
+DRIFT_MAX_PPB = 500_000     # 500 ppm; anything larger is a bad fit, not a crystal
+REANCHOR_MS = 60_000        # ticks_us wraps every ~17.9 min; re-anchor well inside half of that
+
+_PPB = 1_000_000_000
+
+
+class ClockSync:
+    """
+    Device side of {"cmd":"sync"}. Keeps an unwrapped monotonic µs clock
+    (ticks_us + accumulated diffs) and the host's estimate of
+    host_us - device_us, plus a drift rate fitted from successive estimates.
+    Everything is integer µs: single-precision floats cannot hold epoch
+    times. The host does the NTP arithmetic (it owns t0/t3); the device only
+    stamps receive/send instants and applies the result.
+    """
+
+    def __init__(self, drift_min_span_s=getattr(pins_io, "CLOCK_DRIFT_MIN_S", DRIFT_MIN_SPAN_S)):
+        self.drift_min_span_us = int(drift_min_span_s) * 1_000_000
+        self._last = time.ticks_us()
+        self._mono = 0
+        self._poll_ms = time.ticks_ms()
+
+        self.offset_us = None   # host_us - device_us at _at_us
+        self.drift_ppb = 0      # host clock gains this much per device second (ppb)
+        self.rtt_us = None      # round trip of the round that produced offset_us
+        self.updates = 0
+        self.fits = 0
+        self._at_us = 0
+        self._ref_at = None     # drift reference fit
+        self._ref_off = 0
+
+    def now_us(self):
+        # Monotonic device µs since construction, never wraps.
+        t = time.ticks_us()
+        self._mono += time.ticks_diff(t, self._last)
+        self._last = t
+        return self._mono
+
+    def poll(self, now_ms):
+        # Vocatur omni ciclo: small-int compare only, re-anchors now and then.
+        if time.ticks_diff(now_ms, self._poll_ms) >= REANCHOR_MS:
+            self._poll_ms = now_ms
+            self.now_us()
+
+    @property
+    def synced(self):
+        return self.offset_us is not None
+
+    def host_us(self, dev_us=None):
+        # Device µs (now_us() scale) -> host epoch µs; None before the first sync.
+        if self.offset_us is None:
+            return None
+        if dev_us is None:
+            dev_us = self.now_us()
+        return dev_us + self.offset_us + (dev_us - self._at_us) * self.drift_ppb // _PPB
+
+    def host_ms(self, ts_ms=None):
+        # Host epoch ms of a ticks_ms() stamp (e.g. a message's ts_ms), or of now.
+        if self.offset_us is None:
+            return None
+        dev = self.now_us()
+        if ts_ms is not None:
+            dev -= time.ticks_diff(time.ticks_ms(), ts_ms) * 1000
+        return self.host_us(dev) // 1000
+
+    def apply(self, offset_us, at_us, rtt_us=None):
+        # One host estimate: host_us - device_us == offset_us at device time at_us.
+        offset_us = int(offset_us)
+        at_us = int(at_us)
+        if self._ref_at is None:
+            self._ref_at = at_us
+            self._ref_off = offset_us
+        else:
+            span = at_us - self._ref_at
+            if span >= self.drift_min_span_us:
+                d = (offset_us - self._ref_off) * _PPB // span
+                if -DRIFT_MAX_PPB <= d <= DRIFT_MAX_PPB:
+                    # First fit is taken as is, later ones are smoothed.
+                    self.drift_ppb = d if not self.fits else (3 * self.drift_ppb + d) // 4
+                    self.fits += 1
+                self._ref_at = at_us
+                self._ref_off = offset_us
+        self.offset_us = offset_us
+        self._at_us = at_us
+        self.rtt_us = None if rtt_us is None else int(rtt_us)
+        self.updates += 1
+
+    def handle_cmd(self, msg, emit=None):
+        """
+        {"cmd":"sync","seq":n,"t0_us":host}  -> reply with rx_us / tx_us
+        {"cmd":"sync","offset_us":o,"at_us":a,"rtt_us":r}  -> apply estimate
+        rx_us is the receive stamp Interface put in "_rx_us"; tx_us is taken
+        right before the reply goes to emit(). Redit True si mandatum nostrum est.
+        """
+        if msg.get("cmd") != "sync":
+            return False
+        try:
+            if "offset_us" in msg:
+                self.apply(msg["offset_us"], msg.get("at_us", msg.get("_rx_us", self.now_us())), msg.get("rtt_us"))
+                return True
+            rx = msg.get("_rx_us")
+            if rx is None:
+                rx = self.now_us()
+            reply = {
+                "type": "sync",
+                "seq": msg.get("seq"),
+                "t0_us": msg.get("t0_us"),
+                "rx_us": rx,
+                "offset_us": self.offset_us,
+                "drift_ppb": self.drift_ppb,
+                "tx_us": None,
+            }
+            if emit is not None:
+                reply["tx_us"] = self.now_us()
+                emit(reply)
+        except Exception:
+            pass
+        return True
+
+
+clock = ClockSync()
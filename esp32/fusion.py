@@ -0,0 +1,108 @@
+# fusion.py
+# Commentarii Latine: filtrum complementarium pro inclinatione (gyro + accel).
+from array import array
+import math
+
+# Accel only corrects the gyro while |a| is this close to 1 g; bumps and
+# shots (linear acceleration) are ridden out on the gyro alone.
+ACCEL_GATE_G = 0.15
+
+_DEG = math.pi / 180.0
+_PI = math.pi
+_TWO_PI = 2.0 * math.pi
+_COS_MIN = 0.01   # keeps the Euler rates finite near pitch = ±90°
+
+_PITCH = 0
+_ROLL = 1
+_YAW_RATE = 2
+
+
+class TiltFusion:
+    """
+    Complementary filter over the MPU sample stream. Gyro rates are turned
+    into Euler angle rates (the board is mounted rolled, small-angle mixing
+    would be wrong) and integrated every sample; the accel tilt pulls the
+    result back with time constant tau_s. Pitch/roll match MPUSensor.tilt()
+    conventions. State lives in one array('f'); update() allocates no
+    containers, so it can run as an MPU FIFO sink at the full sample rate.
+    """
+
+    def __init__(self, dt_s=0.005, tau_s=0.5, gate_g=ACCEL_GATE_G):
+        self.dt_s = float(dt_s)
+        self.tau_s = float(tau_s)
+        self.gate_g = float(gate_g)
+        self.state = array("f", (0.0, 0.0, 0.0))
+        self.samples = 0
+        self.rejected = 0   # samples where accel was outside the gate
+
+    def reset(self):
+        self.state[_PITCH] = 0.0
+        self.state[_ROLL] = 0.0
+        self.state[_YAW_RATE] = 0.0
+        self.samples = 0
+
+    def update(self, ax, ay, az, gx, gy, gz, dt_s=None):
+        # ax..az in g, gx..gz in dps (MPUSensor units).
+        st = self.state
+        dt = self.dt_s if dt_s is None else dt_s
+
+        roll_a = math.atan2(ay, az)
+        pitch_a = math.atan2(-ax, math.sqrt(ay * ay + az * az))
+
+        if not self.samples:
+            st[_PITCH] = pitch_a
+            st[_ROLL] = roll_a
+            self.samples = 1
+            return
+
+        roll = st[_ROLL]
+        pitch = st[_PITCH]
+        gx *= _DEG
+        gy *= _DEG
+        gz *= _DEG
+        sr = math.sin(roll)
+        cr = math.cos(roll)
+        cp = math.cos(pitch)
+        if -_COS_MIN < cp < _COS_MIN:
+            cp = _COS_MIN if cp >= 0 else -_COS_MIN
+        # Body rates -> Euler rates (ZYX).
+        q = gy * sr + gz * cr
+        roll += (gx + q * math.sin(pitch) / cp) * dt
+        pitch += (gy * cr - gz * sr) * dt
+        st[_YAW_RATE] = q / cp
+
+        a2 = ax * ax + ay * ay + az * az
+        lo = 1.0 - self.gate_g
+        hi = 1.0 + self.gate_g
+        if lo * lo <= a2 <= hi * hi:
+            k = dt / (self.tau_s + dt)
+            e = roll_a - roll
+            if e > _PI:
+                e -= _TWO_PI
+            elif e < -_PI:
+                e += _TWO_PI
+            roll += k * e
+            pitch += k * (pitch_a - pitch)
+        else:
+            self.rejected += 1
+
+        if roll > _PI:
+            roll -= _TWO_PI
+        elif roll < -_PI:
+            roll += _TWO_PI
+        st[_ROLL] = roll
+        st[_PITCH] = pitch
+        self.samples += 1
+
+    @property
+    def pitch(self):
+        return self.state[_PITCH]
+
+    @property
+    def roll(self):
+        return self.state[_ROLL]
+
+    @property
+    def yaw_rate(self):
+        # rad/s about the vertical axis, from the last sample.
+        return self.state[_YAW_RATE]
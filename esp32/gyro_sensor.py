@@ -2,15 +2,112 @@
 from machine import Pin, I2C
 import struct
 import math
+import time
+from array import array
+
+import calstore
+
+_SMPLRT_DIV = 0x19
+_CONFIG = 0x1A
+_FIFO_EN = 0x23
+_INT_PIN_CFG = 0x37
+_INT_ENABLE = 0x38
+_USER_CTRL = 0x6A
+_FIFO_COUNT = 0x72
+_FIFO_R_W = 0x74
+
+# FIFO_EN: TEMP | XG | YG | ZG | ACCEL -> same 14-byte record as 0x3B..0x48.
+_FIFO_EN_ALL = 0xF8
+FIFO_SAMPLE_BYTES = 14
+FIFO_SIZE = 1024
+
+# calibrate(): give up if any gyro axis spans more than this while averaging
+# (raw LSB at ±250 dps, 131 LSB = 1 dps) -> the device was not still.
+CAL_STILL_LSB = 3 * 131
+# calibrate(accel=True): the mean accel must be 1 g (16384 LSB) within this
+# (0.15 g, above the MPU-6050 zero-g offset spec) or the run is refused.
+CAL_GRAVITY_TOL_LSB = 2458
+
+# read_into() / tilt_into() layout of the array('f') output.
+AX, AY, AZ, GX, GY, GZ, TEMP_C, PITCH, ROLL = range(9)
+IMU_LEN = 9
+
+
+def imu_array():
+    return array("f", [0.0] * IMU_LEN)
 
 
 class MPUSensor:
     # Commentarii Latine: MPU-6050 (accel+gyro+temp) simpliciter legit.
-    def __init__(self, i2c_id=1, sda_pin=17, scl_pin=16, freq=400_000, addr=0x68):
+    def __init__(
+        self,
+        i2c_id=1,
+        sda_pin=17,
+        scl_pin=16,
+        freq=400_000,
+        addr=0x68,
+        fifo=False,
+        rate_hz=200,
+        dlpf=3,
+        int_pin=None,
+        persist_cal=False,
+        cal_at_boot=False,
+        cal_samples=200,
+    ):
         self.addr = addr
         self.i2c = I2C(i2c_id, sda=Pin(sda_pin), scl=Pin(scl_pin), freq=freq)
+
+        # FIFO mode: chip samples at rate_hz on its own, poll() drains in bulk.
+        self.fifo = bool(fifo)
+        self.rate_hz = int(rate_hz)
+        self.dlpf = int(dlpf)
+        self.sample_dt_s = 1.0 / self.rate_hz if self.rate_hz > 0 else 0.0
+        self.sample_us = None       # ticks_us capture time of the newest sample
+        self.fifo_samples = 0       # samples drained since boot
+        self.fifo_overflows = 0     # FIFO resets after overflow (samples lost)
+        self.missed = 0             # IRQ mode without FIFO: samples never read
+        self._sinks = []
+        self._have_latest = False
+        # Persistent bus buffers: the read paths below allocate no bytes objects.
+        self._raw = bytearray(FIFO_SAMPLE_BYTES)
+        self._count = bytearray(2)
+        self._temp = bytearray(2)
+        self._fifo_buf = None
+        # Drain well before the FIFO can fill: half its depth, at most 50 ms.
+        depth_ms = (FIFO_SIZE // FIFO_SAMPLE_BYTES) * 1000 // max(1, self.rate_hz)
+        self._drain_ms = max(5, min(50, depth_ms // 2))
+        self._drain_last = time.ticks_ms()
+
+        # INT (data ready, active high pulse) -> IRQ notes time + count only.
+        self._irq_pin = None
+        self._ready = False
+        self._ready_us = 0
+        self._irq_count = 0
+        self._irq_seen = 0
+        self.int_pin = int_pin
         self._init_mpu()
 
+        # Bias in raw LSB (ax, ay, az, gx, gy, gz), subtracted in the integer
+        # unpack: the float scaling per sample stays the same.
+        self._bias = (0, 0, 0, 0, 0, 0)
+        self.persist_cal = bool(persist_cal)
+        self.cal_key = "mpu:%d:%02x" % (i2c_id, addr)
+        self.cal_samples = int(cal_samples)
+        cal = calstore.load(self.cal_key) if self.persist_cal else None
+        if cal:
+            self._set_bias(cal)
+        elif cal_at_boot:
+            # First boot: gyro only; skipped (retried next boot) if moving.
+            self.calibrate()
+        if int_pin is not None:
+            try:
+                self._irq_pin = Pin(int(int_pin), Pin.IN)
+                self._irq_pin.irq(handler=self._on_irq, trigger=Pin.IRQ_RISING)
+                self._writemem(_INT_PIN_CFG, 0x00)   # active high, push-pull, 50 µs pulse
+                self._writemem(_INT_ENABLE, 0x01)    # DATA_RDY_EN
+            except Exception:
+                self._irq_pin = None
+
     def _writemem(self, reg, val):
         self.i2c.writeto_mem(self.addr, reg, bytes((val,)))
 
@@ -19,13 +116,259 @@ class MPUSensor:
         self._writemem(0x6B, 0x00)  # PWR_MGMT_1
         self._writemem(0x1C, 0x00)  # ACCEL_CONFIG
         self._writemem(0x1B, 0x00)  # GYRO_CONFIG
+        # Streaming modes pace the chip; snapshot mode keeps the defaults.
+        if self.fifo or self.int_pin is not None:
+            self._init_rate()
+        if self.fifo:
+            self._init_fifo()
+
+    def _init_rate(self):
+        # Gyro output rate is 1 kHz with the DLPF on (cfg 1..6), 8 kHz without.
+        base = 1000 if 0 < self.dlpf < 7 else 8000
+        div = base // max(1, self.rate_hz) - 1
+        div = 0 if div < 0 else 255 if div > 255 else div
+        self.rate_hz = base // (div + 1)
+        self.sample_dt_s = 1.0 / self.rate_hz
+        self._writemem(_CONFIG, self.dlpf & 0x07)
+        self._writemem(_SMPLRT_DIV, div)
+
+    def _init_fifo(self):
+        self._writemem(_FIFO_EN, _FIFO_EN_ALL)
+        self._fifo_buf = bytearray(FIFO_SIZE - FIFO_SIZE % FIFO_SAMPLE_BYTES)
+        self._fifo_mv = memoryview(self._fifo_buf)
+        self._fifo_reset()
+
+    def _fifo_reset(self):
+        self._writemem(_USER_CTRL, 0x04)  # FIFO_RESET
+        self._writemem(_USER_CTRL, 0x40)  # FIFO_EN
+
+    def _on_irq(self, pin):
+        # ISR: nulla allocatio, nullum I2C; tantum tempus et numerus.
+        self._ready_us = time.ticks_us()
+        self._irq_count += 1
+        self._ready = True
+
+    @property
+    def has_irq(self):
+        return self._irq_pin is not None
+
+    @property
+    def streaming(self):
+        # True when every sample reaches the sinks via poll() (FIFO or IRQ).
+        return self.fifo or self._irq_pin is not None
+
+    def add_sink(self, fn):
+        # fn(ax, ay, az, gx, gy, gz) in g / dps, once per sample, in order;
+        # sample_us holds that sample's capture time during the call.
+        self._sinks.append(fn)
+
+    def _set_bias(self, cal):
+        a = cal.get("accel") or (0, 0, 0)
+        g = cal.get("gyro") or (0, 0, 0)
+        self._bias = (int(a[0]), int(a[1]), int(a[2]), int(g[0]), int(g[1]), int(g[2]))
+
+    @property
+    def bias(self):
+        # Current bias in g / dps.
+        b = self._bias
+        return {
+            "accel_g": (b[0] / 16384.0, b[1] / 16384.0, b[2] / 16384.0),
+            "gyro_dps": (b[3] / 131.0, b[4] / 131.0, b[5] / 131.0),
+        }
+
+    def calibrate(self, n=None, accel=False):
+        """
+        Blocking (~n sample periods): average n register snapshots into the
+        gyro bias; with accel=True also the accel bias: the mean minus 1 g
+        along the measured gravity direction (any mounting, as long as the
+        board is still). Returns False and keeps the old bias when the gyro
+        moved more than CAL_STILL_LSB meanwhile, or the mean accel is not
+        1 g within CAL_GRAVITY_TOL_LSB. In FIFO mode
+        the FIFO is reset afterwards, so the next drain starts fresh.
+        """
+        n = self.cal_samples if n is None else max(1, int(n))
+        period_ms = max(1, 1000 // max(1, self.rate_hz)) if (self.fifo or self.int_pin is not None) else 2
+        sums = [0] * 6
+        lo = [32767] * 3
+        hi = [-32768] * 3
+        raw = self._raw
+        for _ in range(n):
+            self.i2c.readfrom_mem_into(self.addr, 0x3B, raw)
+            ax, ay, az, _, gx, gy, gz = struct.unpack_from(">7h", raw, 0)
+            for i, v in enumerate((ax, ay, az, gx, gy, gz)):
+                sums[i] += v
+            for i, v in enumerate((gx, gy, gz)):
+                if v < lo[i]:
+                    lo[i] = v
+                if v > hi[i]:
+                    hi[i] = v
+            time.sleep_ms(period_ms)
+        self._have_latest = False
+        # IRQ mode: edges during the blocking loop were read here, not missed.
+        self._ready = False
+        self._irq_seen = self._irq_count
+        if self.fifo:
+            # The FIFO kept filling meanwhile: drop that backlog (pre-calibration
+            # records, and a certain overflow) instead of draining it.
+            self._fifo_reset()
+        for i in range(3):
+            if hi[i] - lo[i] > CAL_STILL_LSB:
+                return False
+
+        b = self._bias
+        gyro = [round(sums[3 + i] / n) for i in range(3)]
+        if accel:
+            # Gravity is taken out along the measured direction, not z: the
+            # cannon board is mounted rolled (~110 deg), never level.
+            m = [sums[i] / n for i in range(3)]
+            g = math.sqrt(m[0] * m[0] + m[1] * m[1] + m[2] * m[2])
+            if abs(g - 16384) > CAL_GRAVITY_TOL_LSB:
+                return False
+            k = 1.0 - 16384 / g
+            acc = [round(v * k) for v in m]
+        else:
+            acc = [b[0], b[1], b[2]]
+        cal = {"accel": acc, "gyro": gyro}
+        self._set_bias(cal)
+        if self.persist_cal:
+            calstore.save(self.cal_key, cal)
+        return True
+
+    def _feed(self, data, o):
+        ax, ay, az, _, gx, gy, gz = struct.unpack_from(">7h", data, o)
+        bax, bay, baz, bgx, bgy, bgz = self._bias
+        ax = (ax - bax) / 16384.0
+        ay = (ay - bay) / 16384.0
+        az = (az - baz) / 16384.0
+        gx = (gx - bgx) / 131.0
+        gy = (gy - bgy) / 131.0
+        gz = (gz - bgz) / 131.0
+        for fn in self._sinks:
+            fn(ax, ay, az, gx, gy, gz)
+
+    def poll(self, now_ms=None):
+        """
+        FIFO mode: every _drain_ms read FIFO_COUNT, then the whole backlog in
+        one readfrom_mem, and hand each sample to the sinks. IRQ mode without
+        FIFO: read the new sample once, right after its data-ready edge.
+        Returns the number of new samples (0 when nothing is due).
+        """
+        if self.fifo:
+            return self._drain(now_ms)
+        if not self._ready:
+            return 0
+        self._ready = False
+        ts = self._ready_us
+        seen = self._irq_count
+        self.i2c.readfrom_mem_into(self.addr, 0x3B, self._raw)
+        self.missed += seen - self._irq_seen - 1
+        self._irq_seen = seen
+        self.sample_us = ts
+        self._have_latest = True
+        if self._sinks:
+            self._feed(self._raw, 0)
+        return 1
+
+    def _drain(self, now_ms):
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        if time.ticks_diff(now, self._drain_last) < self._drain_ms:
+            return 0
+        self._drain_last = now
+
+        self.i2c.readfrom_mem_into(self.addr, _FIFO_COUNT, self._count)
+        # Newest counted sample: last data-ready edge, else "now".
+        last_us = self._ready_us if self._irq_pin is not None else time.ticks_us()
+        count = (self._count[0] << 8) | self._count[1]
+        if count >= FIFO_SIZE:
+            # Overflow (count sticks at 1024): record alignment is gone, start clean.
+            self.fifo_overflows += 1
+            self._fifo_reset()
+            return 0
+        n = count // FIFO_SAMPLE_BYTES
+        if not n:
+            return 0
+
+        nbytes = n * FIFO_SAMPLE_BYTES
+        self.i2c.readfrom_mem_into(self.addr, _FIFO_R_W, self._fifo_mv[:nbytes])
+        dt_us = 1_000_000 // self.rate_hz
+        if self._sinks:
+            # Samples are dt apart, the last one captured at last_us.
+            data = self._fifo_buf
+            ts = time.ticks_add(last_us, -(n - 1) * dt_us)
+            for o in range(0, nbytes, FIFO_SAMPLE_BYTES):
+                self.sample_us = ts
+                self._feed(data, o)
+                ts = time.ticks_add(ts, dt_us)
+        self.sample_us = last_us
+        # Newest record becomes what read()/read_into() report.
+        o = nbytes - FIFO_SAMPLE_BYTES
+        self._raw[:] = self._fifo_mv[o:nbytes]
+        self._have_latest = True
+        self.fifo_samples += n
+        return n
+
+    def age_us(self, now_us=None):
+        # µs since the newest sample was captured (wrap-safe), None without one.
+        if self.sample_us is None:
+            return None
+        now = time.ticks_us() if now_us is None else int(now_us)
+        return time.ticks_diff(now, self.sample_us)
+
+    def _fill_raw(self):
+        # FIFO / IRQ mode: newest sample from poll(), no extra bus traffic.
+        if not (self.streaming and self._have_latest):
+            self.i2c.readfrom_mem_into(self.addr, 0x3B, self._raw)
+        return self._raw
 
     def read_raw(self):
-        data = self.i2c.readfrom_mem(self.addr, 0x3B, 14)
-        return struct.unpack(">7h", data)
+        return struct.unpack(">7h", self._fill_raw())
+
+    def read_into(self, out):
+        """
+        Scaled accel (g), gyro (dps) and temp (C) into out[AX..TEMP_C],
+        out = imu_array(). Returns out. No per-sample bytes, dict or nested
+        tuples; not allocation-free: unpack_from still builds one 7-tuple
+        and each scaled value is a boxed float on the ESP32 port.
+        """
+        ax, ay, az, temp, gx, gy, gz = struct.unpack_from(">7h", self._fill_raw(), 0)
+        bax, bay, baz, bgx, bgy, bgz = self._bias
+        out[AX] = (ax - bax) / 16384.0
+        out[AY] = (ay - bay) / 16384.0
+        out[AZ] = (az - baz) / 16384.0
+        out[GX] = (gx - bgx) / 131.0
+        out[GY] = (gy - bgy) / 131.0
+        out[GZ] = (gz - bgz) / 131.0
+        out[TEMP_C] = temp / 340.0 + 36.53
+        return out
+
+    def temp_c(self):
+        # Temperature alone: newest streamed record, else one 2-byte read.
+        if self.streaming and self._have_latest:
+            t = struct.unpack_from(">h", self._raw, 6)[0]
+        else:
+            self.i2c.readfrom_mem_into(self.addr, 0x41, self._temp)
+            t = struct.unpack_from(">h", self._temp, 0)[0]
+        return t / 340.0 + 36.53
+
+    def tilt_into(self, out):
+        # read_into() + accel tilt into out[PITCH], out[ROLL] (radiani).
+        self.read_into(out)
+        ax = out[AX]
+        ay = out[AY]
+        az = out[AZ]
+        out[ROLL] = math.atan2(ay, az)
+        out[PITCH] = math.atan2(-ax, math.sqrt(ay * ay + az * az))
+        return out
 
     def read(self):
         ax, ay, az, temp, gx, gy, gz = self.read_raw()
+        bax, bay, baz, bgx, bgy, bgz = self._bias
+        ax -= bax
+        ay -= bay
+        az -= baz
+        gx -= bgx
+        gy -= bgy
+        gz -= bgz
 
         accel = (ax / 16384.0, ay / 16384.0, az / 16384.0)  # g
         gyro = (gx / 131.0, gy / 131.0, gz / 131.0)          # °/s
@@ -43,4 +386,3 @@ class MPUSensor:
 
         d["tilt_rad"] = (pitch, roll)
         return d
-
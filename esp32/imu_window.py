@@ -0,0 +1,78 @@
+# imu_window.py
+# Commentarii Latine: fenestra IMU: min/max/medium per axem inter nuntios.
+from array import array
+
+_INF = float("inf")
+
+# Axis order, same as MPUSensor sinks: accel x/y/z (g), gyro x/y/z (dps).
+_N = 6
+
+
+class ImuWindow:
+    """
+    Incremental per-axis min/max/sum over the samples between two messages.
+    Fixed-size array('f') accumulators; update() runs as an MPU sink at the
+    full sample rate, summary() reduces the window at emit time. A shock
+    between two messages survives as min/max/p2p even though the emitted
+    accel_g/gyro_dps are a single sample.
+    """
+
+    def __init__(self):
+        self._min = array("f", [_INF] * _N)
+        self._max = array("f", [-_INF] * _N)
+        self._sum = array("f", [0.0] * _N)
+        self.count = 0
+
+    def reset(self):
+        mn = self._min
+        mx = self._max
+        sm = self._sum
+        for i in range(_N):
+            mn[i] = _INF
+            mx[i] = -_INF
+            sm[i] = 0.0
+        self.count = 0
+
+    def _acc(self, i, v):
+        if v < self._min[i]:
+            self._min[i] = v
+        if v > self._max[i]:
+            self._max[i] = v
+        self._sum[i] += v
+
+    def update(self, ax, ay, az, gx, gy, gz):
+        self._acc(0, ax)
+        self._acc(1, ay)
+        self._acc(2, az)
+        self._acc(3, gx)
+        self._acc(4, gy)
+        self._acc(5, gz)
+        self.count += 1
+
+    def p2p_max(self):
+        # Largest peak-to-peak of the accel and gyro axes: (g, dps).
+        if not self.count:
+            return 0.0, 0.0
+        mn = self._min
+        mx = self._max
+        a = max(mx[0] - mn[0], mx[1] - mn[1], mx[2] - mn[2])
+        g = max(mx[3] - mn[3], mx[4] - mn[4], mx[5] - mn[5])
+        return a, g
+
+    def _axes(self, o):
+        mn = self._min
+        mx = self._max
+        sm = self._sum
+        n = self.count
+        return {
+            "min": [mn[o], mn[o + 1], mn[o + 2]],
+            "max": [mx[o], mx[o + 1], mx[o + 2]],
+            "mean": [sm[o] / n, sm[o + 1] / n, sm[o + 2] / n],
+            "p2p": [mx[o] - mn[o], mx[o + 1] - mn[o + 1], mx[o + 2] - mn[o + 2]],
+        }
+
+    def summary(self, accel_key="accel_g", gyro_key="gyro_dps"):
+        # None for an empty window (no sample since the last reset).
+        if not self.count:
+            return None
+        return {"n": self.count, accel_key: self._axes(0), gyro_key: self._axes(3)}
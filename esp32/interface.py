@@ -1,6 +1,8 @@
 # interface.py
 import pins_io
 import ndjson_prefix as ndj
+import clocksync
+import binframe
 
 import time
 
@@ -8,10 +10,24 @@ CLIENT_TTL_MS = 3 * 60 * 1000  # 3 minutes
 
 SPAM_SERIAL = False #Set to true for sensor data on serial port
 
+# Output sinks (byte / error counters per sink, see Interface.sink_stats()).
+SINK_UART = "uart"
+SINK_STDOUT = "stdout"
+SINK_BROADCAST = "broadcast"
+SINK_UNICAST = "unicast"
+SINKS = (SINK_UART, SINK_STDOUT, SINK_BROADCAST, SINK_UNICAST)
+
+# UDP batching: message types that never wait in a batch (latency matters).
+BATCH_BYPASS = ("button",)
+
 class ClientRegistry:
     def __init__(self):
         # key: (ip, port) -> last_seen_ms
         self._clients = {}
+        # clients that asked for binary sensor frames ({"cmd":"bin"})
+        self._binary = set()
+        # clients that accept several lines per datagram ({"cmd":"batch"})
+        self._batch = set()
 
     def note_seen(self, addr):
         # addr = (ip, port)
@@ -26,12 +42,121 @@ class ClientRegistry:
                 dead.append(addr)
         for addr in dead:
             del self._clients[addr]
+            self._binary.discard(addr)
+            self._batch.discard(addr)
+
+    def set_binary(self, addr, on):
+        if on:
+            self._binary.add(addr)
+        else:
+            self._binary.discard(addr)
+
+    def binary(self):
+        return self._binary
+
+    def set_batch(self, addr, on):
+        if on:
+            self._batch.add(addr)
+        else:
+            self._batch.discard(addr)
+
+    def batched(self):
+        return self._batch
 
     def active(self):
         self.prune()
         return list(self._clients.keys())
 
 clients = ClientRegistry()
+
+
+_NL = 10
+_WS = (32, 9, 13)   # space, tab, CR around a line
+
+
+class LineBuffer:
+    """
+    Fixed receive buffer for the UART byte stream. Data is read straight
+    into the free tail (readinto), every byte is scanned for the newline
+    once, and complete lines are handed out as memoryview slices of the
+    buffer. Only an unfinished line is ever moved (to the front, when the
+    tail runs out), so the cost stays linear however bursty the input.
+    A line longer than the buffer is garbage by definition (REPL noise,
+    lost newline): it is dropped up to its newline. Lines without the
+    prefix are skipped without being copied; for the others only the JSON
+    part after the prefix is returned, ready for ndj.parse_payload().
+    """
+
+    def __init__(self, prefix, size):
+        self.prefix = prefix.encode() if isinstance(prefix, str) else bytes(prefix)
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.head = 0       # first unconsumed byte
+        self.tail = 0       # end of data
+        self.scan = 0       # no newline in buf[head:scan]
+        self._skip = False  # inside an oversized line
+        self.dropped = 0    # oversized lines thrown away
+        self.ignored = 0    # complete lines without prefix
+
+    def readinto(self, stream, n):
+        # Read up to n waiting bytes; returns how many arrived.
+        size = len(self.buf)
+        if self.tail == size:
+            k = self.tail - self.head
+            if k == size:
+                # Full and still no newline: too long to be a protocol line.
+                if not self._skip:
+                    self.dropped += 1
+                    self._skip = True
+                k = 0
+            elif k <= self.head:
+                self.buf[:k] = self.mv[self.head:self.tail]
+            elif k:
+                self.buf[:k] = bytes(self.mv[self.head:self.tail])   # overlapping move
+            # next_line() ran dry before this, so the kept bytes hold no newline
+            self.head = 0
+            self.tail = self.scan = k
+        free = size - self.tail
+        got = stream.readinto(self.mv[self.tail:self.tail + (n if n < free else free)]) or 0
+        self.tail += got
+        return got
+
+    def next_line(self):
+        # JSON part of the next complete line that starts with the prefix
+        # (surrounding whitespace trimmed), or None.
+        buf = self.buf
+        pre = self.prefix
+        lp = len(pre)
+        while True:
+            i = self.scan
+            tail = self.tail
+            while i < tail and buf[i] != _NL:
+                i += 1
+            if i >= tail:
+                self.scan = tail
+                if self.head == tail:
+                    self.head = self.tail = self.scan = 0
+                return None
+            j = self.head
+            self.head = self.scan = i + 1
+            if self._skip:
+                self._skip = False   # end of the oversized line
+                continue
+            while j < i and buf[j] in _WS:
+                j += 1
+            e = i
+            while e > j and buf[e - 1] in _WS:
+                e -= 1
+            if e - j < lp:
+                self.ignored += 1
+                continue
+            k = 0
+            while k < lp and buf[j + k] == pre[k]:
+                k += 1
+            if k < lp:
+                self.ignored += 1
+                continue
+            return self.mv[j + lp:e]
         
         
 class Interface:
@@ -42,6 +167,7 @@ class Interface:
         self._uart = None
         self._stdin_poller = None
         self._stdin = None
+        self._stdout = None
 
         # --- Serial backend: UART or stdin
         if getattr(pins_io, "SERIAL_USE_UART", False):
@@ -69,6 +195,8 @@ class Interface:
                 poller = uselect.poll()
                 poller.register(self._stdin, uselect.POLLIN)
                 self._stdin_poller = poller
+                # raw byte stream if the port has one (no str round trip)
+                self._stdout = getattr(sys.stdout, "buffer", sys.stdout)
             except Exception as e:
                 self._stdin_poller = None
                 self._stdin = None
@@ -94,7 +222,30 @@ class Interface:
                 if self.debug:
                     print("UDP init failed:", repr(e))
 
-        self._rx_buf = b""
+        self._rx = LineBuffer(self.prefix, int(getattr(pins_io, "SERIAL_RX_BUF", 1024)))
+        # After {"cmd":"sync"}: add host epoch ms next to every ts_ms.
+        self.host_ts = bool(getattr(pins_io, "CLOCK_HOST_TS", False))
+        # Default: encode_bytes(), one C json.dumps per message. The Python
+        # LineEncoder only when fixed decimals or payload reuse ask for it
+        # (bench_encode.py compares the two on the board).
+        decimals = getattr(pins_io, "NDJSON_DECIMALS", None)
+        self._enc = None
+        if decimals or getattr(pins_io, "SENSORS_REUSE_PAYLOAD", False):
+            self._enc = ndj.LineEncoder(prefix=self.prefix, decimals=decimals, newline=True)
+        self._bcast = (pins_io.UDP_SEND_HOST, pins_io.UDP_SEND_PORT)
+        self.sink_bytes = {k: 0 for k in SINKS}
+        self.sink_errors = {k: 0 for k in SINKS}
+        self._bin = binframe.BinEncoder()
+
+        # Multi-line datagrams: broadcast only if configured (listeners cannot
+        # negotiate), unicast per client after {"cmd":"batch","on":1}.
+        self.batch_bytes = int(getattr(pins_io, "UDP_BATCH_BYTES", 1400))
+        self.batch_ms = int(getattr(pins_io, "UDP_BATCH_MS", 20))
+        self.batch_bcast = bool(getattr(pins_io, "UDP_BATCH_BROADCAST", False))
+        self._batch = bytearray(self.batch_bytes)
+        self._batch_mv = memoryview(self._batch)
+        self._batch_n = 0
+        self._batch_ms = 0      # ticks_ms of the oldest line waiting
 
         # One-time announce so you can see where output went
         self.emit({
@@ -109,37 +260,135 @@ class Interface:
         })
 
     def emit(self, obj):
-        line = ndj.encode_line(obj, prefix=self.prefix)
+        if self.host_ts and clocksync.clock.synced and isinstance(obj, dict) and "ts_ms" in obj:
+            obj["host_ms"] = clocksync.clock.host_ms(obj["ts_ms"])
+
+        # Serialised once; every sink gets a view of the same buffer.
+        serial = SPAM_SERIAL and (self._uart is not None or self._stdout is not None)
+        if not serial and self._udp is None:
+            return
+        try:
+            # prefix + JSON + "\n"; sinks below share views of it
+            if self._enc is not None:
+                line = self._enc.encode(obj)
+            else:
+                line = memoryview(ndj.encode_bytes(obj, prefix=self.prefix) + b"\n")
+        except Exception as e:
+            if self.debug:
+                print("encode failed:", repr(e))
+            return
 
         # serial out
-        if self._uart is not None:
-            try:
-                if SPAM_SERIAL:
-                    self._uart.write(line.encode("utf-8") + b"\n")
-            except Exception as e:
-                if self.debug:
-                    print("UART write failed:", repr(e))
-        else:
-            # USB REPL stdout
-            try:
-                if SPAM_SERIAL:
-                    print(line)
-            except Exception as e:
-                if self.debug:
-                    # last resort: nothing else we can do
-                    pass
+        if serial:
+            if self._uart is not None:
+                self._send(SINK_UART, self._uart.write, line)
+            else:
+                # USB REPL stdout
+                self._send(SINK_STDOUT, self._stdout.write, line)
 
-        # udp out
+        # udp out: one line per datagram, no newline; batched destinations
+        # get the line (with newline) appended to the pending datagram instead
         if self._udp is not None:
-            try:
-                payload = ndj.encode_bytes(obj, prefix=self.prefix)
-                self._udp.sendto(payload, (pins_io.UDP_SEND_HOST, pins_io.UDP_SEND_PORT))
-                for addr in clients.active():
-                    self._udp.sendto(payload, addr)
-                
-            except Exception as e:
-                if self.debug:
-                    print("UDP send failed:", repr(e))
+            payload = line[:len(line) - 1]
+            bins = clients.binary()
+            bats = clients.batched()
+            batching = self.batch_bcast or bool(bats)
+            if batching:
+                if isinstance(obj, dict) and obj.get("type") in BATCH_BYPASS:
+                    self.flush()      # keep order: older lines go out first
+                    batching = False  # this one as its own datagram
+                else:
+                    batching = self._batch_add(line)
+            if not (batching and self.batch_bcast):
+                self._sendto(SINK_BROADCAST, payload, self._bcast)
+            frame = self._bin.encode(obj) if bins and isinstance(obj, dict) else None
+            # Binary clients get sensor frames and no batched datagrams (the
+            # batch holds sensor lines they already have as frames); their
+            # other lines go out one per datagram.
+            for addr in clients.active():
+                if frame is not None and addr in bins:
+                    self._sendto(SINK_UNICAST, frame, addr)
+                elif not (batching and addr in bats and addr not in bins):
+                    self._sendto(SINK_UNICAST, payload, addr)
+
+    def _batch_add(self, line):
+        # False if the line is too big to ever share a datagram (sent alone).
+        n = len(line)
+        if n > self.batch_bytes:
+            return False
+        if self._batch_n + n > self.batch_bytes:
+            self.flush()
+        if not self._batch_n:
+            self._batch_ms = time.ticks_ms()
+        self._batch[self._batch_n:self._batch_n + n] = line
+        self._batch_n += n
+        return True
+
+    def flush(self):
+        # Send the pending multi-line datagram to every batched destination.
+        n = self._batch_n
+        if not n or self._udp is None:
+            return
+        self._batch_n = 0
+        data = self._batch_mv[:n]
+        if self.batch_bcast:
+            self._sendto(SINK_BROADCAST, data, self._bcast)
+        bats = clients.batched()
+        if bats:
+            bins = clients.binary()
+            for addr in clients.active():
+                if addr in bats and addr not in bins:
+                    self._sendto(SINK_UNICAST, data, addr)
+
+    def tick(self, now_ms=None):
+        # Vocatur omni ciclo: max-latency flush of the pending datagram.
+        if self._batch_n:
+            now = time.ticks_ms() if now_ms is None else int(now_ms)
+            if time.ticks_diff(now, self._batch_ms) >= self.batch_ms:
+                self.flush()
+
+    def _send(self, sink, write, data):
+        try:
+            write(data)
+            self.sink_bytes[sink] += len(data)
+        except Exception as e:
+            self.sink_errors[sink] += 1
+            if self.debug:
+                print(sink, "write failed:", repr(e))
+
+    def _sendto(self, sink, data, addr):
+        try:
+            self._udp.sendto(data, addr)
+            self.sink_bytes[sink] += len(data)
+        except Exception as e:
+            self.sink_errors[sink] += 1
+            if self.debug:
+                print("UDP send failed:", repr(e))
+
+    def sink_stats(self):
+        return {k: {"bytes": self.sink_bytes[k], "errors": self.sink_errors[k]} for k in SINKS}
+
+    def handle_cmd(self, msg):
+        # {"cmd":"bin","on":1}: this UDP client gets sensor messages as binframe
+        # frames (unicast only; broadcast stays NDJSON). {"cmd":"batch","on":1}:
+        # this client accepts several lines per datagram. {"cmd":"iface_stats"}:
+        # per-sink byte/error counters. Redit True si nostrum.
+        c = msg.get("cmd")
+        if c == "iface_stats":
+            self.emit({"type": "iface_stats", "ts_ms": time.ticks_ms(), "sinks": self.sink_stats()})
+            return True
+        if c != "bin" and c != "batch":
+            return False
+        src = msg.get("_src")
+        if isinstance(src, dict) and src.get("udp"):
+            on = bool(msg.get("on", 1))
+            if c == "bin":
+                clients.set_binary(src["udp"], on)
+            else:
+                if not on:
+                    self.flush()   # nothing of ours left waiting for it
+                clients.set_batch(src["udp"], on)
+        return True
 
     def poll_messages(self):
         msgs = []
@@ -157,19 +406,25 @@ class Interface:
             except Exception:
                 n = 0
 
-            if n:
+            rx = self._rx
+            while n:
                 try:
-                    data = self._uart.read(n) or b""
+                    got = rx.readinto(self._uart, n)
                 except Exception:
-                    data = b""
-
-                if data:
-                    self._rx_buf += data
-                    while b"\n" in self._rx_buf:
-                        raw, self._rx_buf = self._rx_buf.split(b"\n", 1)
-                        st, obj = ndj.try_parse_line(raw, prefix=self.prefix)
-                        if st == "ok" and isinstance(obj, dict):
-                            out.append(obj)
+                    got = 0
+                if not got:
+                    break
+                n -= got
+                rx_us = clocksync.clock.now_us()
+                while True:
+                    payload = rx.next_line()
+                    if payload is None:
+                        break
+                    # prefix already matched by next_line(); parsed in place
+                    st, obj = ndj.parse_payload(payload)
+                    if st == "ok" and isinstance(obj, dict):
+                        obj["_rx_us"] = rx_us
+                        out.append(obj)
             return out
 
         # stdin mode
@@ -183,8 +438,10 @@ class Interface:
                 line = self._stdin.readline()
                 if not line:
                     break
+                rx_us = clocksync.clock.now_us()
                 st, obj = ndj.try_parse_line(line, prefix=self.prefix)
                 if st == "ok" and isinstance(obj, dict):
+                    obj["_rx_us"] = rx_us
                     out.append(obj)
         except Exception:
             pass
@@ -201,6 +458,7 @@ class Interface:
                 data, addr = self._udp.recvfrom(2048)
             except Exception:
                 break
+            rx_us = clocksync.clock.now_us()   # receive stamp for {"cmd":"sync"}
 
             clients.note_seen(addr)
             print (f"Received {data=}")
@@ -209,6 +467,7 @@ class Interface:
             if st == "ok" and isinstance(obj, dict):
                 print (f"Accepted command {obj=}")            
                 obj["_src"] = {"udp": addr}
+                obj["_rx_us"] = rx_us
                 out.append(obj)
             else:
                 print (f"Failed parse {obj=}")
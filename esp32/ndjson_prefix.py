@@ -19,79 +19,269 @@ def encode_bytes(obj, prefix=NDJSON_PREFIX_DEFAULT, encoding=NDJSON_ENCODING_DEF
     return encode_line(obj, prefix=prefix).encode(encoding)
 
 
-def try_parse_line(line, prefix=NDJSON_PREFIX_DEFAULT, encoding=NDJSON_ENCODING_DEFAULT):
+# LineEncoder: reusable output buffer + cached key fragments.
+LINE_BUF_SIZE = 1024
+KEY_CACHE_MAX = 64   # host-supplied keys (e.g. echoed commands) must not grow it forever
+MAX_DEPTH = 3        # dict nesting written natively (sensor imu_win is 3 deep); deeper -> json.dumps
+
+_SEP = (",", ":")
+_INF = float("inf")
+_POW10 = (1, 10, 100, 1000, 10000, 100000, 1000000)   # decimals are capped at 6
+_SMALL = 1 << 30   # ints below this are written digit by digit (MicroPython small int)
+FIXED_MAX = 1e6    # larger floats with decimals go through "%.nf" (rare, allocates)
+
+
+class LineEncoder:
     """
-    line: str | bytes
-    returns:
-      (None, None)         -> no prefix match
-      ("ok", obj)          -> parsed dict/list/etc
-      ("error", info_dict) -> parse/decode error
+    Writes prefix + JSON (+ newline) into one preallocated bytearray.
+    Dict keys are encoded once and cached as b'"key":' fragments; ints,
+    None and bools are written directly, other leaves go through json.dumps.
+    With decimals={key: n} (n <= 6), floats under that key (directly, or
+    anywhere in the dict/list it holds) are written with n fixed decimals
+    instead of 9 significant digits; non-finite floats then become null.
+    Fixed-point floats and ints are written digit by digit into the buffer,
+    no intermediate str. Without decimals the bytes equal encode_bytes().
+    Returns a memoryview into the buffer, valid until the next encode().
     """
-    if line is None:
-        return None, None
 
-    # Normalize encoding to a real str (MicroPython can be picky here)
-    if not isinstance(encoding, str):
-        try:
-            encoding = encoding.decode("ascii", "replace")
-        except Exception:
-            encoding = "utf-8"
+    def __init__(self, prefix=NDJSON_PREFIX_DEFAULT, size=LINE_BUF_SIZE, encoding=NDJSON_ENCODING_DEFAULT,
+                 decimals=None, newline=False):
+        self.prefix = prefix.encode(encoding) if isinstance(prefix, str) else bytes(prefix)
+        self.encoding = encoding
+        self.newline = bool(newline)
+        self.buf = bytearray(size)
+        self._mv = memoryview(self.buf)
+        self._keys = {}
+        self._fmt = {}
+        for k, n in (decimals or {}).items():
+            self._fmt[k] = max(0, min(len(_POW10) - 1, int(n)))
+        self.overflows = 0   # objects too big for buf, sent via encode_bytes()
 
-    # Normalize prefix to str too (optional but makes it bulletproof)
-    if isinstance(prefix, (bytes, bytearray)):
-        try:
-            prefix = prefix.decode(encoding, "replace")
-        except Exception:
-            prefix = NDJSON_PREFIX_DEFAULT
+    def _key(self, k):
+        f = self._keys.get(k)
+        if f is None:
+            f = (json.dumps(k if isinstance(k, str) else str(k)) + ":").encode(self.encoding)
+            if len(self._keys) < KEY_CACHE_MAX:
+                self._keys[k] = f
+        return f
 
-    if isinstance(line, (bytes, bytearray)):
-        try:
-            line = line.decode(encoding, "replace")
-        except Exception as e:
-            return "error", {"reason": "decode_failed", "detail": str(e)}
+    def _put(self, n, b):
+        m = n + len(b)
+        if m > len(self.buf):
+            raise IndexError   # -> encode() falls back to encode_bytes()
+        self.buf[n:m] = b
+        return m
 
-    line = line.strip()
-    if not line.startswith(prefix):
-        return None, None
+    def _digits(self, n, q, d):
+        # q >= 0 (int) as q / 10**d with exactly d decimals, filled from the right.
+        buf = self.buf
+        w = 1
+        t = q // 10
+        while t:
+            w += 1
+            t //= 10
+        if w <= d:
+            w = d + 1   # leading "0."
+        end = n + w + (1 if d else 0)
+        if end > len(buf):
+            raise IndexError
+        i = end - 1
+        for _ in range(d):
+            buf[i] = 48 + q % 10
+            q //= 10
+            i -= 1
+        if d:
+            buf[i] = 46   # "."
+            i -= 1
+        while i >= n:
+            buf[i] = 48 + q % 10
+            q //= 10
+            i -= 1
+        return end
+
+    def _sign(self, n, neg):
+        if not neg:
+            return n
+        if n >= len(self.buf):
+            raise IndexError
+        self.buf[n] = 45   # "-"
+        return n + 1
 
-    payload = line[len(prefix):].strip()
-    if not payload:
-        return "error", {"reason": "empty_payload"}
+    def _num(self, n, v, d):
+        if v is None:
+            return self._put(n, b"null")
+        if v is True:
+            return self._put(n, b"true")
+        if v is False:
+            return self._put(n, b"false")
+        if isinstance(v, int):
+            if -_SMALL < v < _SMALL:
+                return self._digits(self._sign(n, v < 0), -v if v < 0 else v, 0)
+            return self._put(n, str(v).encode())
+        if d is not None and isinstance(v, float):
+            if v != v or v == _INF or v == -_INF:
+                return self._put(n, b"null")
+            a = -v if v < 0 else v
+            if a >= FIXED_MAX:
+                return self._put(n, (("%." + str(d) + "f") % v).encode())
+            # Half-up rounding of the scaled value; "-0.00" is written as 0.00.
+            q = int(a * _POW10[d] + 0.5)
+            return self._digits(self._sign(n, v < 0 and q > 0), q, d)
+        return None   # not a scalar we write natively
 
+    def _val(self, n, v, fmt, depth):
+        # fmt: decimals (int) in force here, or None
+        m = self._num(n, v, fmt)
+        if m is not None:
+            return m
+        if isinstance(v, dict) and depth < MAX_DEPTH:
+            return self._dict(n, v, fmt, depth + 1)
+        if isinstance(v, (list, tuple)) and depth < MAX_DEPTH:
+            put = self._put
+            n = put(n, b"[")
+            first = True
+            for x in v:
+                if not first:
+                    n = put(n, b",")
+                first = False
+                n = self._val(n, x, fmt, depth + 1)
+            return put(n, b"]")
+        return self._put(n, json.dumps(v, separators=_SEP).encode(self.encoding))
+
+    def _dict(self, n, d, fmt, depth):
+        # Bounded by MAX_DEPTH; the key's own format wins over the inherited one.
+        put = self._put
+        fmts = self._fmt
+        n = put(n, b"{")
+        first = True
+        for k, v in d.items():
+            if not first:
+                n = put(n, b",")
+            first = False
+            n = put(n, self._key(k))
+            n = self._val(n, v, fmts.get(k, fmt), depth)
+        return put(n, b"}")
+
+    def encode(self, obj):
+        if isinstance(obj, dict):
+            try:
+                n = self._put(0, self.prefix)
+                n = self._dict(n, obj, None, 0)
+                if self.newline:
+                    n = self._put(n, b"\n")
+                return self._mv[:n]
+            except IndexError:
+                self.overflows += 1
+        b = encode_bytes(obj, prefix=self.prefix.decode(self.encoding), encoding=self.encoding)
+        return memoryview(b + b"\n" if self.newline else b)
+
+
+_WS = (32, 9, 13, 10)   # space, tab, CR, LF as byte values
+_prefix_cache = {}
+
+
+def _prefix_bytes(prefix, encoding):
+    # Encoded prefix, cached per prefix for the default encoding (no key tuple
+    # per call); other encodings are rare and encoded each time.
+    if isinstance(prefix, (bytes, bytearray)):
+        return prefix
+    if encoding == NDJSON_ENCODING_DEFAULT:
+        pb = _prefix_cache.get(prefix)
+        if pb is None:
+            pb = prefix.encode(encoding)
+            if len(_prefix_cache) < 8:
+                _prefix_cache[prefix] = pb
+        return pb
     try:
-        return "ok", json.loads(payload)
-    except Exception as e:
-        return "error", {"reason": "json_parse_failed", "detail": str(e), "payload": payload[:200]}
-    
-    
-def try_parse_line_s(line, prefix=NDJSON_PREFIX_DEFAULT, encoding=NDJSON_ENCODING_DEFAULT):
+        return prefix.encode(encoding)
+    except Exception:
+        return NDJSON_PREFIX_DEFAULT.encode()
+
+
+def try_parse_line(line, prefix=NDJSON_PREFIX_DEFAULT, encoding=NDJSON_ENCODING_DEFAULT):
     """
-    line: str | bytes
+    line: str | bytes | bytearray | memoryview
     returns:
       (None, None)         -> no prefix match
       ("ok", obj)          -> parsed dict/list/etc
       ("error", info_dict) -> parse/decode error
+    Bytes input is matched against the encoded prefix before anything is
+    decoded or copied, so noise costs a few byte compares; only the JSON
+    part of a matching line is handed to json.loads (parse_payload()).
     """
     if line is None:
         return None, None
 
-    if isinstance(line, (bytes, bytearray)):
+    if isinstance(line, str):
+        line = line.strip()
+        if isinstance(prefix, (bytes, bytearray)):
+            try:
+                prefix = prefix.decode(encoding, "replace")
+            except Exception:
+                prefix = NDJSON_PREFIX_DEFAULT
+        if not line.startswith(prefix):
+            return None, None
+        payload = line[len(prefix):].strip()
+        if not payload:
+            return "error", {"reason": "empty_payload"}
         try:
-            line = line.decode(encoding, errors="replace")
-        except Exception:
-            return "error", {"reason": "decode_failed"}
+            return "ok", json.loads(payload)
+        except Exception as e:
+            return "error", {"reason": "json_parse_failed", "detail": str(e), "payload": payload[:200]}
 
-    line = line.strip()
-    if not line.startswith(prefix):
-        return None, None
+    pb = _prefix_bytes(prefix, encoding)
+    lp = len(pb)
+    if isinstance(line, bytes):
+        # C-level compare; strip() (a copy) only if the line starts with whitespace.
+        if not line.startswith(pb):
+            if not line or line[0] not in _WS:
+                return None, None
+            line = line.strip()
+            if not line.startswith(pb):
+                return None, None
+        payload = line[lp:]
+    else:
+        # bytearray / memoryview: compare in place, parse the JSON part in place.
+        line = memoryview(line)
+        n = len(line)
+        i = 0
+        while i < n and line[i] in _WS:
+            i += 1
+        if n - i < lp:
+            return None, None
+        k = 0
+        while k < lp and line[i + k] == pb[k]:
+            k += 1
+        if k < lp:
+            return None, None
+        payload = line[i + lp:n]
+    return parse_payload(payload, encoding)
 
-    payload = line[len(prefix):].strip()
-    if not payload:
-        return "error", {"reason": "empty_payload"}
 
+def parse_payload(payload, encoding=NDJSON_ENCODING_DEFAULT):
+    """
+    JSON part of a line whose prefix was already matched (bytes, bytearray
+    or memoryview) -> ("ok", obj) / ("error", info_dict). MicroPython's
+    json.loads reads any buffer, so a memoryview into a receive buffer is
+    parsed without a copy; CPython's only takes str/bytes/bytearray and
+    gets one. json.loads skips surrounding whitespace itself.
+    """
     try:
-        return "ok", json.loads(payload)
+        if encoding != NDJSON_ENCODING_DEFAULT:
+            return "ok", json.loads(bytes(payload).decode(encoding))
+        try:
+            return "ok", json.loads(payload)
+        except TypeError:
+            return "ok", json.loads(bytes(payload))
     except Exception as e:
-        return "error", {"reason": "json_parse_failed", "detail": str(e), "payload": payload[:200]}
+        if not bytes(payload).strip():
+            return "error", {"reason": "empty_payload"}
+        try:
+            shown = bytes(payload[:200]).decode(encoding, "replace")
+        except Exception:
+            shown = None
+        return "error", {"reason": "json_parse_failed", "detail": str(e), "payload": shown}
 
 
+# Former str-only variant, kept for callers that still use the name.
+try_parse_line_s = try_parse_line
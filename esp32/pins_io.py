@@ -3,6 +3,11 @@
 
 # NDJSON prefix
 NDJSON_PREFIX = "@MUSE#J="
+# Fixed decimals per field for floats on all transports (applies to everything
+# under that key). None = json.dumps precision (~9 significant digits) via
+# one C json.dumps; a dict here selects the Python LineEncoder (bench_encode.py).
+NDJSON_DECIMALS = None
+# NDJSON_DECIMALS = {"tilt": 4, "yaw_rate_rad_s": 3, "accel_g": 4, "gyro_dps": 2, "temp_c": 2}
 
 # --- I2C: ToF (VL53L0X)
 TOF_I2C_ID = 0
@@ -12,6 +17,21 @@ TOF_I2C_FREQ = 400_000
 TOF_BUDGET_US = 40_000
 TOF_PRE_PCLK = 18
 TOF_FINAL_PCLK = 14
+TOF_CONTINUOUS = True       # sensor ranges on its own; read_mm() collects results
+TOF_PERIOD_MS = 0           # 0 = back-to-back, > 0 = timed inter-measurement period
+TOF_INT_PIN = None          # VL53L0X GPIO1 (data ready, active low); None = poll status
+TOF_IO_STATS = False        # add "tof_io" (I2C transactions per sample) to telemetry
+TOF_PERSIST_CAL = True      # keep SPAD/VHV/phase calibration in CAL_FILE, skip it on warm boot
+TOF_PROFILE = None          # None = the three values above; or a tof_sensor.TOF_PROFILES name / "auto"
+# Several VL53L0X on the ToF bus: one dict per sensor, in telemetry order
+# (distance_mm becomes a list). Each needs its own XSHUT pin (a single
+# entry at 0x29 may omit it); addresses are assigned at boot.
+# None = one sensor at 0x29, distance_mm stays an int.
+TOF_SENSORS = None
+# TOF_SENSORS = [
+#     {"xshut_pin": 32, "address": 0x30},                  # X axis
+#     {"xshut_pin": 33, "address": 0x31, "int_pin": 34},   # Z axis
+# ]
 
 # --- I2C: MPU-6050 (gyro/accel)
 MPU_I2C_ID = 1
@@ -19,9 +39,39 @@ MPU_SDA_PIN = 17
 MPU_SCL_PIN = 16
 MPU_I2C_FREQ = 400_000
 MPU_ADDR = 0x68
+MPU_FIFO = False            # chip samples at MPU_RATE_HZ into its FIFO; Sensors.poll() drains it in bulk
+MPU_RATE_HZ = 200           # FIFO sample rate (SMPLRT_DIV), rounded to what the divider can do
+MPU_DLPF = 3                # CONFIG.DLPF_CFG: 3 = 44 Hz accel / 42 Hz gyro bandwidth
+MPU_INT_PIN = None          # MPU INT (data ready, active high); paces reads and timestamps samples
+MPU_PERSIST_CAL = True      # keep gyro/accel bias in CAL_FILE ({"cmd":"imu_cal"} to redo)
+MPU_CAL_AT_BOOT = True      # no stored bias yet: measure gyro bias at boot (device must be still)
+MPU_CAL_SAMPLES = 200
+MPU_FUSION = False          # tilt from gyro+accel complementary filter (+ yaw rate) instead of accel only
+MPU_FUSION_TAU_S = 0.5      # accel correction time constant; longer = smoother, slower drift removal
+MPU_WINDOW = False          # add "imu_win": per-axis min/max/mean/p2p + n of all samples since the last message
+
+# --- Calibration store (flash)
+CAL_FILE = "cal.json"
 
 # --- Sensors cadence
-SENSORS_RATE_HZ = 12
+SENSORS_RATE_HZ = 12        # telemetry (message) rate
+# Own sample-and-hold rate per source; None = sampled when a message is built.
+# With any of them set, messages carry "age_ms" per source.
+SENSORS_IMU_HZ = None       # IMU snapshots (ignored while MPU_FIFO / MPU_INT_PIN stream)
+SENSORS_TOF_HZ = None       # sets the ToF timed ranging period
+SENSORS_TEMP_HZ = None      # temperature (own 2-byte read)
+# Change-driven telemetry: a sensor message only goes out when a value moved
+# more than its deadband since the last one sent, or every heartbeat.
+# None = every SENSORS_RATE_HZ period, as before.
+SENSORS_DEADBAND = None
+# SENSORS_DEADBAND = {"mm": 5, "rad": 0.01, "g": 0.03, "dps": 2.0, "c": 0.5}
+SENSORS_HEARTBEAT_MS = 1000
+SENSORS_REUSE_PAYLOAD = False   # one sensor payload object updated in place (no per-message dicts);
+                                # also selects LineEncoder, see bench_encode.py
+
+# --- Host clock sync ({"cmd":"sync"}, see host/muse_host/sync.py)
+CLOCK_HOST_TS = False       # once synced, every message with ts_ms also gets "host_ms" (host epoch ms)
+CLOCK_DRIFT_MIN_S = 60      # min spacing of two sync results before they update the drift estimate
 
 # --- Button
 BUTTON_PIN = 14
@@ -48,6 +98,7 @@ SERIAL_UART_ID = 0
 SERIAL_BAUD = 115200
 SERIAL_TX_PIN = None      # set if needed
 SERIAL_RX_PIN = None      # set if needed
+SERIAL_RX_BUF = 1024      # UART receive buffer = longest accepted line; longer ones are dropped
 
 # --- UDP transport config (optional)
 UDP_ENABLED = True
@@ -55,6 +106,13 @@ UDP_BIND_PORT = 7777
 UDP_SEND_HOST = "255.255.255.255"
 UDP_SEND_PORT = 7777
 UDP_BROADCAST = True
+# Several lines per datagram ("\n"-terminated each), up to UDP_BATCH_BYTES,
+# flushed at the latest UDP_BATCH_MS after the first one; button events are
+# never held. Clients opt in with {"cmd":"batch","on":1}; broadcast only
+# batches with UDP_BATCH_BROADCAST (its listeners cannot negotiate).
+UDP_BATCH_BYTES = 1400
+UDP_BATCH_MS = 20
+UDP_BATCH_BROADCAST = False
 
 DEMO_REPEAT = False #True
 
@@ -1,19 +1,42 @@
 # sensors.py
 import time
+from array import array
 
 import pins_io
-from tof_sensor import ToFSensor
+from tof_sensor import ToFSensor, ToFArray
+import gyro_sensor as gs
 from gyro_sensor import MPUSensor
+from fusion import TiltFusion
+from imu_window import ImuWindow
 
 SENSORS_CACHE_DEFAULT = True
 
 FIELD_TYPE = "sensor"
 FIELD_TS_MS = "ts_ms"
 FIELD_DISTANCE_MM = "distance_mm"
+FIELD_DISTANCE_AGE_US = "distance_age_us"
+FIELD_TOF_IO = "tof_io"
+FIELD_IMU_AGE_US = "imu_age_us"
 FIELD_TILT = "tilt"
+FIELD_YAW_RATE = "yaw_rate_rad_s"
 FIELD_ACCEL_G = "accel_g"
 FIELD_GYRO_DPS = "gyro_dps"
 FIELD_TEMP_C = "temp_c"
+FIELD_AGE_MS = "age_ms"
+FIELD_SUPPRESSED = "suppressed"
+FIELD_IMU_WINDOW = "imu_win"
+
+_NAN = float("nan")
+
+# age_ms keys, one per independently scheduled source.
+AGE_TOF = "tof"
+AGE_IMU = "imu"
+AGE_TEMP = "temp"
+
+
+def _period_ms(hz):
+    # None / 0 -> no own schedule (sampled when a message is built).
+    return int(1000 // hz) if hz else 0
 
 
 class Sensors:
@@ -25,6 +48,12 @@ class Sensors:
         rate_hz=pins_io.SENSORS_RATE_HZ,
         enable_cache=SENSORS_CACHE_DEFAULT,
         field_names=None,
+        imu_hz=getattr(pins_io, "SENSORS_IMU_HZ", None),
+        tof_hz=getattr(pins_io, "SENSORS_TOF_HZ", None),
+        temp_hz=getattr(pins_io, "SENSORS_TEMP_HZ", None),
+        deadband=getattr(pins_io, "SENSORS_DEADBAND", None),
+        heartbeat_ms=getattr(pins_io, "SENSORS_HEARTBEAT_MS", 1000),
+        reuse_payload=getattr(pins_io, "SENSORS_REUSE_PAYLOAD", False),
     ):
         # Default cfg from pins_io, override by passing dicts
         tof_default = {
@@ -35,6 +64,12 @@ class Sensors:
             "budget_us": pins_io.TOF_BUDGET_US,
             "pre_pclk": pins_io.TOF_PRE_PCLK,
             "final_pclk": pins_io.TOF_FINAL_PCLK,
+            "continuous": pins_io.TOF_CONTINUOUS,
+            "period_ms": pins_io.TOF_PERIOD_MS,
+            "int_pin": getattr(pins_io, "TOF_INT_PIN", None),
+            "persist_cal": getattr(pins_io, "TOF_PERSIST_CAL", False),
+            "sensors": getattr(pins_io, "TOF_SENSORS", None),
+            "profile": getattr(pins_io, "TOF_PROFILE", None),
         }
         mpu_default = {
             "i2c_id": pins_io.MPU_I2C_ID,
@@ -42,37 +77,245 @@ class Sensors:
             "scl_pin": pins_io.MPU_SCL_PIN,
             "freq": pins_io.MPU_I2C_FREQ,
             "addr": pins_io.MPU_ADDR,
+            "fifo": getattr(pins_io, "MPU_FIFO", False),
+            "rate_hz": getattr(pins_io, "MPU_RATE_HZ", 200),
+            "dlpf": getattr(pins_io, "MPU_DLPF", 3),
+            "int_pin": getattr(pins_io, "MPU_INT_PIN", None),
+            "persist_cal": getattr(pins_io, "MPU_PERSIST_CAL", False),
+            "cal_at_boot": getattr(pins_io, "MPU_CAL_AT_BOOT", False),
+            "cal_samples": getattr(pins_io, "MPU_CAL_SAMPLES", 200),
         }
+        # ToF schedule = the sensor's own timed ranging period.
+        if tof_hz:
+            tof_default["period_ms"] = _period_ms(tof_hz)
         if tof_cfg:
             tof_default.update(tof_cfg)
         if mpu_cfg:
             mpu_default.update(mpu_cfg)
 
-        self.tof = ToFSensor(**tof_default)
+        # Several sensors on the ToF bus -> ToFArray, distance_mm becomes a list.
+        tof_list = tof_default.pop("sensors", None)
+        if tof_list:
+            self.tof = ToFArray(tof_list, **tof_default)
+        else:
+            self.tof = ToFSensor(**tof_default)
         self.mpu = MPUSensor(**mpu_default)
+        self._imu = gs.imu_array()
 
-        self.rate_hz = int(rate_hz) if rate_hz is not None else int(pin_io.SENSORS_RATE_HZ)
+        # Fused tilt: fed every sample as an MPU sink (FIFO / IRQ), else per snapshot.
+        self.fusion = None
+        self._fusion_ms = None
+        if getattr(pins_io, "MPU_FUSION", False):
+            self.fusion = TiltFusion(
+                dt_s=self.mpu.sample_dt_s,
+                tau_s=getattr(pins_io, "MPU_FUSION_TAU_S", 0.5),
+            )
+            if self.mpu.streaming:
+                self.mpu.add_sink(self.fusion.update)
+
+        # Per-message IMU window (min/max/mean/p2p), fed like the fusion filter.
+        self.window = None
+        if getattr(pins_io, "MPU_WINDOW", False):
+            self.window = ImuWindow()
+            if self.mpu.streaming:
+                self.mpu.add_sink(self.window.update)
+
+        self.rate_hz = int(rate_hz) if rate_hz is not None else int(pins_io.SENSORS_RATE_HZ)
         if self.rate_hz < 1:
             self.rate_hz = 1
         self.period_ms = int(1000 // self.rate_hz)
 
+        # Per-source schedules, sample-and-hold. IMU: snapshot period when the
+        # MPU is not streaming (FIFO / IRQ pace themselves). Temp: own period.
+        self.imu_period_ms = _period_ms(imu_hz)
+        self.temp_period_ms = _period_ms(temp_hz)
+        self.scheduled = bool(imu_hz or tof_hz or temp_hz)
+        now = time.ticks_ms()
+        self._imu_ms = None
+        self._imu_next = now
+        self._temp = None
+        self._temp_ms = None
+        self._temp_next = now
+
         self.enable_cache = bool(enable_cache)
         self._last_ms = time.ticks_ms()
         self._cache = None
+        self.reuse_payload = bool(reuse_payload)
+        self._payload = None
 
         fn = field_names or {}
         self.F_TYPE = fn.get("type", FIELD_TYPE)
         self.F_TS = fn.get("ts_ms", FIELD_TS_MS)
         self.F_DIST = fn.get("distance_mm", FIELD_DISTANCE_MM)
+        self.F_DIST_AGE = fn.get("distance_age_us", FIELD_DISTANCE_AGE_US)
+        self.F_TOF_IO = fn.get("tof_io", FIELD_TOF_IO)
+        self.F_IMU_AGE = fn.get("imu_age_us", FIELD_IMU_AGE_US)
+        self.tof_io_stats = bool(getattr(pins_io, "TOF_IO_STATS", False))
         self.F_TILT = fn.get("tilt", FIELD_TILT)
+        self.F_YAW_RATE = fn.get("yaw_rate_rad_s", FIELD_YAW_RATE)
         self.F_ACCEL = fn.get("accel_g", FIELD_ACCEL_G)
         self.F_GYRO = fn.get("gyro_dps", FIELD_GYRO_DPS)
         self.F_TEMP = fn.get("temp_c", FIELD_TEMP_C)
+        self.F_AGE = fn.get("age_ms", FIELD_AGE_MS)
+        self.F_SUPPRESSED = fn.get("suppressed", FIELD_SUPPRESSED)
+        self.F_WIN = fn.get("imu_win", FIELD_IMU_WINDOW)
+
+        # Change-driven telemetry: deadband per unit, heartbeat as a floor.
+        # Compared against the last *emitted* values, so slow drift still adds up.
+        self.heartbeat_ms = int(heartbeat_ms or 0)
+        self.suppressed_total = 0
+        self._suppressed = 0
+        self._emit_ms = None
+        self._db = None
+        if deadband:
+            n_dist = len(self.tof.sensors) if isinstance(self.tof, ToFArray) else 1
+            mm = deadband.get("mm", 0)
+            rad = deadband.get("rad", 0)
+            g = deadband.get("g", 0)
+            dps = deadband.get("dps", 0)
+            c = deadband.get("c", 0)
+            # Layout: distance(s), pitch, roll, accel xyz, gyro xyz, temp.
+            self._db = array("f", [mm] * n_dist + [rad, rad, g, g, g, dps, dps, dps, c])
+            self._db_g = g
+            self._db_dps = dps
+            self._ref = array("f", [_NAN] * len(self._db))
+            self._cur = array("f", [_NAN] * len(self._db))
+
+        if self.reuse_payload:
+            # One read() with fresh dicts fixes key set and order; optional
+            # fields are present from the start (null until they have a value).
+            self.reuse_payload = False
+            p = self.read(force=True)
+            if self.tof.has_irq:
+                p.setdefault(self.F_DIST_AGE, None)
+            if self.mpu.has_irq:
+                p.setdefault(self.F_IMU_AGE, None)
+            if self._db is not None:
+                p.setdefault(self.F_SUPPRESSED, 0)
+            self._payload = p
+            self.reuse_payload = True
 
     def due(self, now_ms=None):
         now = time.ticks_ms() if now_ms is None else int(now_ms)
         return time.ticks_diff(now, self._last_ms) >= self.period_ms
 
+    def handle_cmd(self, msg, emit=None):
+        # Redit True si mandatum ad sensoria pertinet. emit: where the
+        # imu_cal result goes ({"type":"imu_cal","ok":...}).
+        c = msg.get("cmd")
+        if c == "tof_recal":
+            return self.tof.recalibrate()
+        if c == "tof_profile":
+            return self.tof.set_profile(msg.get("profile"))
+        if c == "imu_cal":
+            # Recognised even if the device moved; the old bias stays then.
+            ok = self.mpu.calibrate(msg.get("samples"), accel=bool(msg.get("accel")))
+            if ok and self.fusion is not None:
+                self.fusion.reset()
+            if emit is not None:
+                emit({"type": "imu_cal", "ok": ok, "accel": bool(msg.get("accel")), "ts_ms": time.ticks_ms()})
+            return True
+        return False
+
+    def poll(self, now_ms=None):
+        # Vocatur omni ciclo: cheap, non-blocking sensor housekeeping.
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        self.tof.poll(now)
+        if self.mpu.poll(now):
+            self._imu_ms = now
+        elif self.imu_period_ms and time.ticks_diff(now, self._imu_next) >= 0:
+            self._imu_next = time.ticks_add(self._imu_next, self.imu_period_ms)
+            if time.ticks_diff(now, self._imu_next) >= 0:
+                self._imu_next = time.ticks_add(now, self.imu_period_ms)  # fell behind
+            self._sample_imu(now)
+            self._imu_ms = now
+        if self.temp_period_ms and time.ticks_diff(now, self._temp_next) >= 0:
+            self._temp_next = time.ticks_add(now, self.temp_period_ms)
+            self._temp = self.mpu.temp_c()
+            self._temp_ms = now
+
+    def _sample_imu(self, now):
+        # Snapshot (or newest streamed record) into self._imu.
+        v = self._imu
+        if self.fusion is None:
+            self.mpu.tilt_into(v)
+        else:
+            self.mpu.read_into(v)
+        if self.mpu.streaming:
+            return
+        if self.window is not None:
+            self.window.update(v[gs.AX], v[gs.AY], v[gs.AZ], v[gs.GX], v[gs.GY], v[gs.GZ])
+        if self.fusion is None:
+            return
+        # Polled IMU: one fusion step per snapshot, dt from the snapshot cadence.
+        dt = None
+        if self._fusion_ms is not None:
+            dt = time.ticks_diff(now, self._fusion_ms) / 1000.0
+        self._fusion_ms = now
+        self.fusion.update(v[gs.AX], v[gs.AY], v[gs.AZ], v[gs.GX], v[gs.GY], v[gs.GZ], dt)
+
+    def _age(self, now, t):
+        return None if t is None else time.ticks_diff(now, t)
+
+    def _flatten(self, p, out):
+        i = 0
+        d = p.get(self.F_DIST)
+        for x in (d if isinstance(d, list) else (d,)):
+            out[i] = _NAN if x is None else x
+            i += 1
+        t = p[self.F_TILT]
+        a = p[self.F_ACCEL]
+        g = p[self.F_GYRO]
+        for x in (t["pitch_rad"], t["roll_rad"], a["x"], a["y"], a["z"], g["x"], g["y"], g["z"], p[self.F_TEMP]):
+            out[i] = _NAN if x is None else x
+            i += 1
+
+    def changed(self, payload, now_ms=None):
+        """
+        Deadband gate for a read() payload: True when any value moved past
+        its deadband since the last emitted message, or heartbeat_ms passed.
+        Then the payload gets "suppressed" (messages skipped since the last
+        one) and becomes the new reference. Always True without deadbands.
+        """
+        if self._db is None:
+            return True
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        cur = self._cur
+        ref = self._ref
+        db = self._db
+        self._flatten(payload, cur)
+
+        emit = self._emit_ms is None or (
+            self.heartbeat_ms and time.ticks_diff(now, self._emit_ms) >= self.heartbeat_ms
+        )
+        if not emit and self.window is not None:
+            # A bump inside the window counts even if the sampled values settled.
+            pa, pg = self.window.p2p_max()
+            emit = pa > self._db_g or pg > self._db_dps
+        if not emit:
+            for i in range(len(cur)):
+                a = cur[i]
+                b = ref[i]
+                if (a != a) != (b != b):
+                    emit = True  # value appeared / vanished
+                    break
+                if a == a and abs(a - b) > db[i]:
+                    emit = True
+                    break
+        if not emit:
+            self._suppressed += 1
+            self.suppressed_total += 1
+            return False
+
+        for i in range(len(cur)):
+            ref[i] = cur[i]
+        if self.window is not None:
+            self.window.reset()
+        payload[self.F_SUPPRESSED] = self._suppressed
+        self._suppressed = 0
+        self._emit_ms = now
+        return True
+
     def read(self, force=False, now_ms=None):
         now = time.ticks_ms() if now_ms is None else int(now_ms)
 
@@ -82,22 +325,86 @@ class Sensors:
 
         self._last_ms = now
 
-        dist = self.tof.read_mm()
-        m = self.mpu.tilt()
-
-        pitch, roll = m.get("tilt_rad", (None, None))
-        ax, ay, az = m.get("accel_g", (None, None, None))
-        gx, gy, gz = m.get("gyro_dps", (None, None, None))
-
-        payload = {
-            "type": self.F_TYPE,
-            self.F_TS: now,
-            self.F_DIST: dist,
-            self.F_TILT: {"pitch_rad": pitch, "roll_rad": roll},
-            self.F_ACCEL: {"x": ax, "y": ay, "z": az},
-            self.F_GYRO: {"x": gx, "y": gy, "z": gz},
-            self.F_TEMP: m.get("temp_c"),
-        }
+        # Composer: held values; only unscheduled sources are sampled here.
+        dist = self.tof.read_mm(now)
+        v = self._imu
+        if self.mpu.streaming or not self.imu_period_ms:
+            self._sample_imu(now)
+            if not self.mpu.streaming:
+                self._imu_ms = now
+        temp = self._temp
+        temp_ms = self._temp_ms
+        if not self.temp_period_ms:
+            temp = v[gs.TEMP_C]
+            temp_ms = self._imu_ms
+
+        ax, ay, az = v[gs.AX], v[gs.AY], v[gs.AZ]
+        gx, gy, gz = v[gs.GX], v[gs.GY], v[gs.GZ]
+        pitch, roll = v[gs.PITCH], v[gs.ROLL]
+
+        if self.fusion is not None:
+            pitch, roll = self.fusion.pitch, self.fusion.roll
+
+        # Reuse mode: one payload object, built once, values overwritten in
+        # place (keys never change, so nothing is rebuilt or left to the GC).
+        reuse = self.reuse_payload
+        if reuse:
+            payload = self._payload
+            tilt = payload[self.F_TILT]
+            acc = payload[self.F_ACCEL]
+            gyr = payload[self.F_GYRO]
+        else:
+            tilt = {}
+            acc = {}
+            gyr = {}
+            payload = {
+                "type": self.F_TYPE,
+                self.F_TS: None,
+                self.F_DIST: None,
+                self.F_TILT: tilt,
+                self.F_ACCEL: acc,
+                self.F_GYRO: gyr,
+                self.F_TEMP: None,
+            }
+        payload[self.F_TS] = now
+        payload[self.F_DIST] = dist
+        tilt["pitch_rad"] = pitch
+        tilt["roll_rad"] = roll
+        acc["x"] = ax
+        acc["y"] = ay
+        acc["z"] = az
+        gyr["x"] = gx
+        gyr["y"] = gy
+        gyr["z"] = gz
+        payload[self.F_TEMP] = temp
+
+        if self.window is not None:
+            payload[self.F_WIN] = self.window.summary(self.F_ACCEL, self.F_GYRO)
+            # With deadbands, changed() closes the window on the message that goes out.
+            if self._db is None:
+                self.window.reset()
+
+        if self.scheduled:
+            age = payload.get(self.F_AGE) if reuse else None
+            if age is None:
+                age = payload[self.F_AGE] = {}
+            age[AGE_TOF] = self.tof.age_ms(now)
+            age[AGE_IMU] = self._age(now, self._imu_ms)
+            age[AGE_TEMP] = self._age(now, temp_ms)
+
+        # GPIO1 IRQ gives the exact capture instant; report it as age (wrap-safe).
+        if self.tof.has_irq and (dist is not None or reuse):
+            payload[self.F_DIST_AGE] = self.tof.age_us() if dist is not None else None
+
+        if self.fusion is not None:
+            tilt[self.F_YAW_RATE] = self.fusion.yaw_rate
+
+        # MPU data-ready IRQ: exact capture instant of the reported IMU sample.
+        if self.mpu.has_irq and (self.mpu.sample_us is not None or reuse):
+            payload[self.F_IMU_AGE] = self.mpu.age_us()
+
+        if self.tof_io_stats:
+            payload[self.F_TOF_IO] = self.tof.io_per_sample
 
         if self.enable_cache:
             self._cache = payload
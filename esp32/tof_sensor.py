@@ -1,6 +1,28 @@
 # tof_sensor.py
 from machine import Pin, I2C
-from vl53l0x import VL53L0X
+import time
+from vl53l0x import VL53L0X, DEFAULT_ADDRESS, set_i2c_address
+import calstore
+
+# No result for this many measurement periods -> sensor is considered stalled.
+STALL_PERIODS = 4
+# read_mm() reports None once the last good sample is older than this.
+STALE_MS = 1000
+
+# Named accuracy/speed trade-offs (ST API / Pololu presets).
+# signal_mcps: return signal rate limit; lower reaches further but lets noise in.
+TOF_PROFILES = {
+    "high_speed": {"budget_us": 20_000, "pre_pclk": 14, "final_pclk": 10, "signal_mcps": 0.25},
+    "default": {"budget_us": 33_000, "pre_pclk": 14, "final_pclk": 10, "signal_mcps": 0.25},
+    "long_range": {"budget_us": 33_000, "pre_pclk": 18, "final_pclk": 14, "signal_mcps": 0.1},
+    "high_accuracy": {"budget_us": 200_000, "pre_pclk": 14, "final_pclk": 10, "signal_mcps": 0.25},
+}
+
+# "auto": high_speed while the distance moves, high_accuracy once it settles.
+# Both share VCSEL periods, so a switch is a budget write, no recalibration.
+PROFILE_AUTO = "auto"
+AUTO_FAST = "high_speed"
+AUTO_SLOW = "high_accuracy"
 
 
 class ToFSensor:
@@ -14,29 +36,474 @@ class ToFSensor:
         budget_us=40_000,
         pre_pclk=18,
         final_pclk=14,
+        continuous=True,
+        period_ms=0,
+        int_pin=None,
+        persist_cal=False,
+        address=DEFAULT_ADDRESS,
+        i2c=None,
+        profile=None,
+        auto_fast_mm=30,
+        auto_settle_mm=10,
+        auto_settle_ms=500,
     ):
-        self.i2c = I2C(i2c_id, sda=Pin(sda_pin), scl=Pin(scl_pin), freq=freq)
-        self.tof = VL53L0X(self.i2c)
+        # i2c: shared bus object (ToFArray); otherwise the sensor owns its bus.
+        self.i2c = i2c or I2C(i2c_id, sda=Pin(sda_pin), scl=Pin(scl_pin), freq=freq)
+        self.address = int(address)
+        self.budget_us = int(budget_us)
+        self.pre_pclk = int(pre_pclk)
+        self.final_pclk = int(final_pclk)
+
+        # SPAD + VHV/phase calibration, kept in flash per bus/address.
+        self.persist_cal = bool(persist_cal)
+        self.cal_key = "tof:%d:%02x" % (i2c_id, self.address)
+        self.warm_boot = False
+        self._setup(calstore.load(self.cal_key) if self.persist_cal else None)
+
+        # period_ms = 0 -> back-to-back; > 0 -> timed (inter-measurement period).
+        self.period_ms = int(period_ms or 0)
+        self.budget_ms = int(budget_us) // 1000
+        self.continuous = False
+        self.stalls = 0
+
+        self._last_mm = None
+        self._last_ms = None
+        self._pending = False
+        self._since_ms = time.ticks_ms()
+        self.sample_us = None
+        self.io_per_sample = None
+        self._io_mark = self.tof.io_count
+
+        # GPIO1 (active low, "new sample ready") -> IRQ sets a flag only.
+        self._irq_pin = None
+        self._ready = False
+        self._ready_us = 0
+        if int_pin is not None:
+            try:
+                self._irq_pin = Pin(int(int_pin), Pin.IN, Pin.PULL_UP)
+                self._irq_pin.irq(handler=self._on_irq, trigger=Pin.IRQ_FALLING)
+            except Exception:
+                self._irq_pin = None
+
+        # Profiles: None = the budget/pclk arguments above.
+        self.profile = None
+        self.auto = False
+        self.auto_fast_mm = int(auto_fast_mm)
+        self.auto_settle_mm = int(auto_settle_mm)
+        self.auto_settle_ms = int(auto_settle_ms)
+        self._settle_mm = None
+        self._settle_ms = 0
+        if profile:
+            self.set_profile(profile)
+
+        if continuous:
+            self.start()
+
+    def _setup(self, cal=None):
+        # Stored calibration is only valid for the VCSEL periods it was taken with.
+        if cal and (cal.get("pre_pclk") != self.pre_pclk or cal.get("final_pclk") != self.final_pclk):
+            cal = None
+        try:
+            self.tof = VL53L0X(self.i2c, address=self.address, cal=cal)
+        except Exception:
+            if not cal:
+                raise
+            # Stale/foreign calibration: fall back to a cold boot.
+            cal = None
+            self.tof = VL53L0X(self.i2c, address=self.address)
+        self.warm_boot = cal is not None
 
         # Optiones “best effort” — si library variant est, non frangimus.
         try:
-            self.tof.set_measurement_timing_budget(budget_us)
+            self.tof.set_measurement_timing_budget(self.budget_us)
         except Exception:
             pass
 
         try:
-            self.tof.set_Vcsel_pulse_period(self.tof.vcsel_period_type[0], int(pre_pclk))
-            self.tof.set_Vcsel_pulse_period(self.tof.vcsel_period_type[1], int(final_pclk))
+            recal = not self.warm_boot
+            self.tof.set_Vcsel_pulse_period(self.tof.vcsel_period_type[0], self.pre_pclk, recal)
+            self.tof.set_Vcsel_pulse_period(self.tof.vcsel_period_type[1], self.final_pclk, recal)
         except Exception:
             pass
 
+        try:
+            if self.warm_boot:
+                self.tof.set_ref_calibration(cal["vhv"], cal["phase"])
+            elif self.persist_cal:
+                c = self.tof.calibration()
+                c["pre_pclk"] = self.pre_pclk
+                c["final_pclk"] = self.final_pclk
+                calstore.save(self.cal_key, c)
+        except Exception:
+            pass
+
+    def recalibrate(self):
+        # Calibrationem in flash delet et sensorem a frigido iterum init.
+        was_running = self.continuous
+        self.stop()
+        if self.persist_cal:
+            calstore.clear(self.cal_key)
+        self._setup(None)
+        if self.profile:
+            self._apply_profile(self.profile)
+        self._io_mark = self.tof.io_count
+        if was_running:
+            self.start()
+        return True
+
+    def set_profile(self, name):
+        """
+        Switch to a TOF_PROFILES entry, or PROFILE_AUTO. Ranging is stopped
+        for the register writes and restarted; a VCSEL change also reruns the
+        phase calibration (tens of ms). Returns False for unknown names and
+        when the chip rejects the register writes.
+        """
+        if name == PROFILE_AUTO:
+            self.auto = True
+            self._settle_mm = None
+            return self._apply_profile(AUTO_SLOW)
+        if name not in TOF_PROFILES:
+            return False
+        self.auto = False
+        return self._apply_profile(name)
+
+    def _apply_profile(self, name):
+        p = TOF_PROFILES[name]
+        was_running = self.continuous
+        self.stop()
+        try:
+            ok = self.tof.set_signal_rate_limit(p["signal_mcps"])
+            if ok and p["pre_pclk"] != self.pre_pclk:
+                ok = self.tof.set_Vcsel_pulse_period(self.tof.vcsel_period_type[0], p["pre_pclk"])
+            if ok and p["final_pclk"] != self.final_pclk:
+                ok = self.tof.set_Vcsel_pulse_period(self.tof.vcsel_period_type[1], p["final_pclk"])
+            if ok:
+                self.tof.set_measurement_timing_budget(p["budget_us"])
+        except Exception:
+            ok = False
+        if not ok:
+            # Profile state stays as it was; the caller sees the failure.
+            if was_running:
+                self.start()
+            return False
+        self.profile = name
+        self.pre_pclk = p["pre_pclk"]
+        self.final_pclk = p["final_pclk"]
+        self.budget_us = p["budget_us"]
+        self.budget_ms = self.budget_us // 1000
+        if was_running:
+            self.start()
+        return True
+
+    def _auto_step(self, mm, prev_mm, now):
+        # Rapide si distantia saltat; accurate postquam auto_settle_ms quieta.
+        if self.profile != AUTO_FAST:
+            if prev_mm is not None and abs(mm - prev_mm) > self.auto_fast_mm:
+                self._settle_mm = mm
+                self._settle_ms = now
+                self._apply_profile(AUTO_FAST)
+            return
+        if self._settle_mm is None or abs(mm - self._settle_mm) > self.auto_settle_mm:
+            self._settle_mm = mm
+            self._settle_ms = now
+        elif time.ticks_diff(now, self._settle_ms) >= self.auto_settle_ms:
+            self._apply_profile(AUTO_SLOW)
+
+    def _on_irq(self, pin):
+        # ISR: nulla allocatio, nullum I2C; tantum vexillum et tempus.
+        self._ready_us = time.ticks_us()
+        self._ready = True
+
+    @property
+    def has_irq(self):
+        return self._irq_pin is not None
+
     def scan(self):
         return self.i2c.scan()
 
-    def read_mm(self):
-        # Redit distantiam in millimetris (int), vel None si error.
+    def start(self):
+        # Sensor ipse continue metitur; nos tantum resultatum colligimus.
+        self._ready = False
         try:
-            return int(self.tof.ping())
+            self.tof.start(self.period_ms)
+            self.continuous = True
         except Exception:
+            self.continuous = False
+        self._pending = self.continuous
+        self._since_ms = time.ticks_ms()
+        return self.continuous
+
+    def stop(self):
+        self._pending = False
+        if not self.continuous:
+            return
+        self.continuous = False
+        try:
+            self.tof.stop()
+        except Exception:
+            pass
+
+    def _interval_ms(self):
+        # Time between results the sensor can deliver.
+        return self.period_ms if self.period_ms > self.budget_ms else self.budget_ms
+
+    def _stall_ms(self):
+        return STALL_PERIODS * self._interval_ms() + 20
+
+    def _recover(self, now):
+        # Sensor silet: re-arm (single-shot) vel re-start (continuous).
+        self.stalls += 1
+        self._pending = False
+        if self.continuous:
+            try:
+                self.tof.stop()
+            except Exception:
+                pass
+            self.start()
+        self._since_ms = now
+
+    def poll(self, now_ms=None):
+        """
+        Non-blocking step; call every loop. With GPIO1 wired the bus is only
+        touched when the IRQ flagged a new range. Without it the bus is left
+        alone until a result can be due, then one burst read per poll
+        (status + range). Returns True when a new sample was taken.
+        """
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        try:
+            if not self._pending:
+                self.tof.trigger()
+                self._pending = True
+                self._since_ms = now
+                return False
+
+            if self._ready:
+                self._ready = False
+                ts_us = self._ready_us
+                mm = self.tof.fetch()
+            else:
+                elapsed = time.ticks_diff(now, self._since_ms)
+                stalled = elapsed > self._stall_ms()
+                # IRQ mode: status is only read as a fallback after a lost edge.
+                if self._irq_pin is not None and not stalled:
+                    return False
+                if elapsed < (self._interval_ms() * 3) // 4:
+                    return False
+                mm = self.tof.poll_fetch()
+                if mm is None:
+                    if stalled:
+                        self._recover(now)
+                    return False
+                ts_us = time.ticks_us()
+        except Exception:
+            self._pending = False
+            return False
+
+        prev_mm = self._last_mm
+        self._last_mm = int(mm)
+        self._last_ms = now
+        self.sample_us = ts_us
+        self._since_ms = now
+        # I2C transactions spent since the previous sample (incl. idle polls).
+        io = self.tof.io_count
+        self.io_per_sample = io - self._io_mark
+        self._io_mark = io
+        # Single-shot: next trigger on the following poll(); continuous keeps running.
+        self._pending = self.continuous
+        if self.auto:
+            self._auto_step(self._last_mm, prev_mm, now)
+        return True
+
+    def latest_mm(self, now_ms=None):
+        # Ultima mensura sine bus; None si nulla vel nimis vetus.
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        if self._last_ms is None or time.ticks_diff(now, self._last_ms) > STALE_MS:
+            return None
+        return self._last_mm
+
+    def age_ms(self, now_ms=None):
+        # ms since the last sample was collected, None without one.
+        if self._last_ms is None:
             return None
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        return time.ticks_diff(now, self._last_ms)
+
+    def age_us(self, now_us=None):
+        # µs since the last sample was captured (wrap-safe), None without one.
+        if self.sample_us is None:
+            return None
+        now = time.ticks_us() if now_us is None else int(now_us)
+        return time.ticks_diff(now, self.sample_us)
+
+    def read_mm(self, now_ms=None):
+        # Redit distantiam in millimetris (int), vel None si nulla recens mensura.
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        self.poll(now)
+        return self.latest_mm(now)
+
+
+class ToFArray:
+    # Commentarii Latine: plures VL53L0X in uno bus; XSHUT ordine, inscriptiones novae.
+    """
+    Several VL53L0X on one I2C bus. All XSHUT lines are pulled low, then each
+    sensor is woken in turn and moved to its own address before init, so only
+    one chip ever answers at 0x29. Every sensor needs an XSHUT line (a
+    single sensor at 0x29 may do without); a sensor that fails to come up
+    is put back into reset. Continuous ranging is started staggered by
+    interval / N and poll() lets at most one sensor touch the bus per call
+    (round robin), so N sensors cost one sample's I/O per loop instead of
+    N x timing budget. Distances come back as a list in configuration order.
+    """
+
+    def __init__(
+        self,
+        sensors,
+        i2c_id=0,
+        sda_pin=21,
+        scl_pin=22,
+        freq=400_000,
+        continuous=True,
+        int_pin=None,
+        **common
+    ):
+        # sensors: [{"xshut_pin": 32, "address": 0x30, "int_pin": None, ...}, ...];
+        # per-sensor keys override the common ToFSensor options. A top-level
+        # int_pin is ignored: GPIO1 lines are per sensor.
+        self.i2c = I2C(i2c_id, sda=Pin(sda_pin), scl=Pin(scl_pin), freq=freq)
+        self.continuous = bool(continuous)
+
+        # Without XSHUT a chip is awake at 0x29 from power-up and would be
+        # moved along by every other sensor's readdress; only a lone sensor
+        # that keeps the default address may do without.
+        for i, cfg in enumerate(sensors):
+            if cfg.get("xshut_pin") is None and (
+                len(sensors) > 1 or int(cfg.get("address", DEFAULT_ADDRESS)) != DEFAULT_ADDRESS
+            ):
+                raise ValueError("ToF sensor %d: xshut_pin required (only a single sensor at 0x%02x may omit it)"
+                                 % (i, DEFAULT_ADDRESS))
+
+        xshut = []
+        for cfg in sensors:
+            p = cfg.get("xshut_pin")
+            xshut.append(Pin(int(p), Pin.OUT, value=0) if p is not None else None)
+        time.sleep_ms(10)
+
+        self.sensors = []
+        for i, cfg in enumerate(sensors):
+            opts = dict(common)
+            opts.update(cfg)
+            opts.pop("xshut_pin", None)
+            addr = int(opts.pop("address", DEFAULT_ADDRESS))
+            s = None
+            try:
+                if xshut[i] is not None:
+                    xshut[i].value(1)
+                    time.sleep_ms(2)  # t_BOOT 1.2 ms
+                if addr != DEFAULT_ADDRESS:
+                    set_i2c_address(self.i2c, addr)
+                s = ToFSensor(
+                    i2c_id=i2c_id,
+                    i2c=self.i2c,
+                    address=addr,
+                    continuous=False,
+                    **opts
+                )
+            except Exception:
+                # Absent/dead sensor keeps its slot; it simply reports None.
+                # Back into reset, so it does not answer at 0x29 next to the
+                # sensor woken after it.
+                s = None
+                if xshut[i] is not None:
+                    xshut[i].value(0)
+            self.sensors.append(s)
+
+        # Stagger first results across one measurement interval.
+        n = len(self.sensors)
+        now = time.ticks_ms()
+        self._armed = [False] * n
+        self._start_at = [now] * n
+        step = 0
+        for s in self.sensors:
+            if s is not None:
+                step = max(step, s._interval_ms())
+        step = step // n if n else 0
+        for i in range(n):
+            self._start_at[i] = time.ticks_add(now, i * step)
+        self._rr = 0
+
+    @property
+    def has_irq(self):
+        for s in self.sensors:
+            if s is not None and s.has_irq:
+                return True
+        return False
+
+    @property
+    def io_per_sample(self):
+        return [s.io_per_sample if s is not None else None for s in self.sensors]
+
+    def scan(self):
+        return self.i2c.scan()
+
+    def recalibrate(self):
+        for s in self.sensors:
+            if s is not None:
+                s.recalibrate()
+        return True
+
+    def set_profile(self, name):
+        ok = False
+        for s in self.sensors:
+            if s is not None and s.set_profile(name):
+                ok = True
+        return ok
+
+    def poll(self, now_ms=None):
+        """
+        Round robin over the sensors, starting after the one served last.
+        IRQ-flag checks and "not due yet" are free; the first sensor that
+        actually uses the bus ends this call. Returns True on a new sample.
+        """
+        n = len(self.sensors)
+        if not n:
+            return False
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        got = False
+        i = self._rr
+        for k in range(n):
+            i = (self._rr + k) % n
+            s = self.sensors[i]
+            if s is None:
+                continue
+            if not self._armed[i]:
+                if time.ticks_diff(now, self._start_at[i]) < 0:
+                    continue
+                self._armed[i] = True
+                if self.continuous:
+                    s.start()
+                    break
+            io = s.tof.io_count
+            if s.poll(now):
+                got = True
+            if s.tof.io_count != io:
+                break
+        self._rr = (i + 1) % n
+        return got
+
+    def latest_mm(self, now_ms=None):
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        return [s.latest_mm(now) if s is not None else None for s in self.sensors]
+
+    def age_ms(self, now_ms=None):
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        return [s.age_ms(now) if s is not None else None for s in self.sensors]
+
+    def age_us(self, now_us=None):
+        now = time.ticks_us() if now_us is None else int(now_us)
+        return [s.age_us(now) if s is not None and s.has_irq else None for s in self.sensors]
 
+    def read_mm(self, now_ms=None):
+        # Lista distantiarum (mm) in ordine configurationis.
+        now = time.ticks_ms() if now_ms is None else int(now_ms)
+        self.poll(now)
+        return self.latest_mm(now)
@@ -104,17 +104,44 @@ VHV_CONFIG_PAD_SCL_SDA__EXTSUP_HV = 0x89
 ALGO_PHASECAL_LIM = 0x30
 ALGO_PHASECAL_CONFIG_TIMEOUT = 0x30
 
+_PAGE_SELECT = const(0xff)
+
+# Page-0 config registers only this driver writes: reads are served from a
+# shadow copy, so _flag() and the sequence/timeout getters skip the bus.
+_SHADOWED = (
+    _SYSTEM_SEQUENCE,
+    MSRC_CONFIG_TIMEOUT_MACROP,
+    _MSRC_CONFIG,
+    _GPIO_MUX_ACTIVE_HIGH,
+    _EXTSUP_HV,
+    PRE_RANGE_CONFIG_VCSEL_PERIOD,
+    FINAL_RANGE_CONFIG_VCSEL_PERIOD,
+)
+
 
 class TimeoutError(RuntimeError):
     pass
 
 
+DEFAULT_ADDRESS = 0x29
+
+
+def set_i2c_address(i2c, new_address, address=DEFAULT_ADDRESS):
+    # Move a freshly booted sensor off the default address before init().
+    # Volatile: XSHUT low or a power cycle brings it back to 0x29.
+    i2c.writeto_mem(address, I2C_SLAVE_DEVICE_ADDRESS, bytes((new_address & 0x7F,)))
+
+
 class VL53L0X():
-    def __init__(self, i2c, address=0x29):
+    def __init__(self, i2c, address=DEFAULT_ADDRESS, cal=None):
         self.i2c = i2c
         self.address = address
+        self.io_count = 0       # I2C transactions issued (reads + writes)
+        self._page = 0
+        self._shadow = {}
+        self._osc_calibrate = None
         utime.sleep_ms(100) # give the I2C time to init
-        self.init()
+        self.init(cal=cal)
         self._started = False
         self.measurement_timing_budget_us = 0
         self.set_measurement_timing_budget(self.measurement_timing_budget_us)
@@ -134,6 +161,10 @@ class VL53L0X():
                          }
         self.vcsel_period_type = ["VcselPeriodPreRange", "VcselPeriodFinalRange"]
 
+    def set_address(self, new_address):
+        self._register(I2C_SLAVE_DEVICE_ADDRESS, new_address & 0x7F)
+        self.address = new_address & 0x7F
+
     def ping(self):
         self.start()
         distance = self.read()
@@ -141,6 +172,7 @@ class VL53L0X():
         return distance
 
     def _registers(self, register, values=None, struct='B'):
+        self.io_count += 1
         if values is None:
             size = ustruct.calcsize(struct)
             data = self.i2c.readfrom_mem(self.address, register, size)
@@ -148,10 +180,27 @@ class VL53L0X():
             return values
         data = ustruct.pack(struct, *values)
         self.i2c.writeto_mem(self.address, register, data)
+        self._note_write(register, data)
+
+    def _note_write(self, register, data):
+        if register == _PAGE_SELECT:
+            self._page = data[0]
+            return
+        if self._page:
+            return
+        for i in range(len(data)):
+            if register + i in _SHADOWED:
+                self._shadow[register + i] = data[i]
 
     def _register(self, register, value=None, struct='B'):
         if value is None:
-            return self._registers(register, struct=struct)[0]
+            shadowed = struct == 'B' and not self._page and register in _SHADOWED
+            if shadowed and register in self._shadow:
+                return self._shadow[register]
+            value = self._registers(register, struct=struct)[0]
+            if shadowed:
+                self._shadow[register] = value
+            return value
         self._registers(register, (value,), struct=struct)
 
     def _flag(self, register=0x00, bit=0, value=None):
@@ -166,10 +215,24 @@ class VL53L0X():
         self._register(register, data)
 
     def _config(self, *config):
-        for register, value in config:
-            self._register(register, value)
+        # Runs of consecutive registers go out as one auto-increment write.
+        n = len(config)
+        i = 0
+        while i < n:
+            register, value = config[i]
+            j = i + 1
+            while j < n and config[j][0] == register + (j - i):
+                j += 1
+            if j - i == 1:
+                self._register(register, value)
+            else:
+                values = [config[k][1] for k in range(i, j)]
+                self._registers(register, values, struct='%dB' % (j - i))
+            i = j
 
-    def init(self, power2v8=True):
+    def init(self, power2v8=True, cal=None):
+        # cal: dict from calibration() of an earlier boot; skips the SPAD
+        # info readout and the VHV/phase reference calibration loops.
         self._flag(_EXTSUP_HV, 0, power2v8)
 
         # I2C standard mode
@@ -197,7 +260,12 @@ class VL53L0X():
 
         self._register(_SYSTEM_SEQUENCE, 0xff)
 
-        spad_count, is_aperture = self._spad_info()
+        if cal:
+            spad_count, is_aperture = cal["spad_count"], bool(cal["spad_aperture"])
+        else:
+            spad_count, is_aperture = self._spad_info()
+        self.spad_count = spad_count
+        self.spad_aperture = is_aperture
         spad_map = bytearray(self._registers(_SPAD_ENABLES, struct='6B'))
 
         # set reference spads
@@ -323,10 +391,13 @@ class VL53L0X():
         # self._register(_SYSTEM_SEQUENCE, 0xe8)
         # self._timing_budget(budget)
 
-        self._register(_SYSTEM_SEQUENCE, 0x01)
-        self._calibrate(0x40)
-        self._register(_SYSTEM_SEQUENCE, 0x02)
-        self._calibrate(0x00)
+        if cal:
+            self.set_ref_calibration(cal["vhv"], cal["phase"])
+        else:
+            self._register(_SYSTEM_SEQUENCE, 0x01)
+            self._calibrate(0x40)
+            self._register(_SYSTEM_SEQUENCE, 0x02)
+            self._calibrate(0x00)
 
         self._register(_SYSTEM_SEQUENCE, 0xe8)
 
@@ -385,6 +456,42 @@ class VL53L0X():
         self._register(_INTERRUPT_CLEAR, 0x01)
         self._register(_SYSRANGE_START, 0x00)
 
+    def _ref_calibration_io(self, vhv=None, phase=None):
+        # VHV (0xcb) and phase (0xee) results, read or restored (ST API layout).
+        self._config(
+            (0xFF, 0x01),
+            (0x00, 0x00),
+            (0xFF, 0x00),
+        )
+        if vhv is None:
+            vhv = self._register(0xCB) & 0x7F
+            phase = self._register(0xEE) & 0x7F
+        else:
+            self._register(0xCB, (self._register(0xCB) & 0x80) | (vhv & 0x7F))
+            self._register(0xEE, (self._register(0xEE) & 0x80) | (phase & 0x7F))
+        self._config(
+            (0xFF, 0x01),
+            (0x00, 0x01),
+            (0xFF, 0x00),
+        )
+        return vhv, phase
+
+    def ref_calibration(self):
+        return self._ref_calibration_io()
+
+    def set_ref_calibration(self, vhv, phase):
+        self._ref_calibration_io(int(vhv), int(phase))
+
+    def calibration(self):
+        # Everything init(cal=...) needs to skip its calibration loops.
+        vhv, phase = self.ref_calibration()
+        return {
+            "spad_count": self.spad_count,
+            "spad_aperture": 1 if self.spad_aperture else 0,
+            "vhv": vhv,
+            "phase": phase,
+        }
+
     def start(self, period=0):
         self._config(
             (0x80, 0x01),
@@ -396,10 +503,14 @@ class VL53L0X():
             (0x80, 0x00),
         )
         if period:
-            oscilator = self._register(_OSC_CALIBRATE, struct='>H')
+            # Factory oscillator trim never changes; read it once.
+            if self._osc_calibrate is None:
+                self._osc_calibrate = self._register(_OSC_CALIBRATE, struct='>H')
+            oscilator = self._osc_calibrate
             if oscilator:
                 period *= oscilator
-            self._register(_MEASURE_PERIOD, period, struct='>H')
+            # SYSTEM_INTERMEASUREMENT_PERIOD is a 32-bit register.
+            self._register(_MEASURE_PERIOD, period, struct='>I')
             self._register(_SYSRANGE_START, 0x04)
         else:
             self._register(_SYSRANGE_START, 0x02)
@@ -417,17 +528,9 @@ class VL53L0X():
         self._started = False
 
     def read(self):
+        # Blocking read on top of the split API below.
         if not self._started:
-            self._config(
-                (0x80, 0x01),
-                (0xFF, 0x01),
-                (0x00, 0x00),
-                (0x91, self._stop_variable),
-                (0x00, 0x01),
-                (0xFF, 0x00),
-                (0x80, 0x00),
-                (_SYSRANGE_START, 0x01),
-            )
+            self.trigger()
             for timeout in range(_IO_TIMEOUT):
                 if not self._register(_SYSRANGE_START) & 0x01:
                     break
@@ -435,19 +538,56 @@ class VL53L0X():
             else:
                 raise TimeoutError()
         for timeout in range(_IO_TIMEOUT):
-            if self._register(_RESULT_INTERRUPT_STATUS) & 0x07:
+            if self.poll_ready():
                 break
             utime.sleep_ms(1)
         else:
             raise TimeoutError()
+        return self.fetch()
+
+    # Non-blocking split API: trigger() -> poll_ready() -> fetch().
+    # None of these sleep; the caller owns the schedule.
+
+    def trigger(self):
+        # Start one single-shot measurement. No-op while continuous ranging
+        # is running, the sensor triggers itself then.
+        if self._started:
+            return
+        self._config(
+            (0x80, 0x01),
+            (0xFF, 0x01),
+            (0x00, 0x00),
+            (0x91, self._stop_variable),
+            (0x00, 0x01),
+            (0xFF, 0x00),
+            (0x80, 0x00),
+            (_SYSRANGE_START, 0x01),
+        )
+
+    def poll_ready(self):
+        # One status read: True once a range result is waiting.
+        return bool(self._register(_RESULT_INTERRUPT_STATUS) & 0x07)
+
+    def fetch(self):
+        # Range result (mm) + interrupt clear; call only after poll_ready().
         value = self._register(_RESULT_RANGE_STATUS + 10, struct='>H')
         self._register(_INTERRUPT_CLEAR, 0x01)
         return value
 
+    def poll_fetch(self):
+        # poll_ready() + fetch() with status and range in one burst read
+        # (0x13..0x1f): one transaction when idle, two per collected sample.
+        self.io_count += 1
+        data = self.i2c.readfrom_mem(self.address, _RESULT_INTERRUPT_STATUS, 13)
+        if not data[0] & 0x07:
+            return None
+        self._register(_INTERRUPT_CLEAR, 0x01)
+        return (data[11] << 8) | data[12]
+
     def set_signal_rate_limit(self, limit_Mcps):
         if limit_Mcps < 0 or limit_Mcps > 511.99:
             return False
-        self._register(0x44, limit_Mcps * (1 << 7))
+        self._register(_FINAL_RATE_RTN_LIMIT, int(limit_Mcps * (1 << 7)), struct='>H')
         return True
 
     def decode_Vcsel_period(self, reg_val):
@@ -456,7 +596,7 @@ class VL53L0X():
     def encode_Vcsel_period(self, period_pclks):
         return (((period_pclks) >> 1) - 1)
 
-    def set_Vcsel_pulse_period(self, type, period_pclks):
+    def set_Vcsel_pulse_period(self, type, period_pclks, recal=True):
         vcsel_period_reg = self.encode_Vcsel_period(period_pclks)
 
         self.get_sequence_step_enables()
@@ -479,11 +619,11 @@ class VL53L0X():
 
             new_pre_range_timeout_mclks = self.timeout_microseconds_to_Mclks(self.timeouts["pre_range_us"],
                                                                              period_pclks)
-            self._register(PRE_RANGE_CONFIG_TIMEOUT_MACROP_HI, self.encode_timeout(new_pre_range_timeout_mclks))
+            self._register(PRE_RANGE_CONFIG_TIMEOUT_MACROP_HI, self.encode_timeout(new_pre_range_timeout_mclks), struct='>H')
 
             new_msrc_timeout_mclks = self.timeout_microseconds_to_Mclks(self.timeouts["msrc_dss_tcc_us"],
                                                                         period_pclks)
-            self._register(MSRC_CONFIG_TIMEOUT_MACROP, 255 if new_msrc_timeout_mclks > 256 else (new_msrc_timeout_mclks - 1))
+            self._register(MSRC_CONFIG_TIMEOUT_MACROP, 255 if new_msrc_timeout_mclks > 256 else (int(new_msrc_timeout_mclks) - 1))
         elif type == self.vcsel_period_type[1]:
             if period_pclks == 8:
                 self._register(FINAL_RANGE_CONFIG_VALID_PHASE_HIGH, 0x10)
@@ -526,14 +666,16 @@ class VL53L0X():
 
             if self.enables["pre_range"]:
                 new_final_range_timeout_mclks += 1
-            self._register(FINAL_RANGE_CONFIG_TIMEOUT_MACROP_HI, self.encode_timeout(new_final_range_timeout_mclks))
+            self._register(FINAL_RANGE_CONFIG_TIMEOUT_MACROP_HI, self.encode_timeout(new_final_range_timeout_mclks), struct='>H')
         else:
             return False
         self.set_measurement_timing_budget(self.measurement_timing_budget_us)
-        sequence_config = self._register(SYSTEM_SEQUENCE_CONFIG)
-        self._register(SYSTEM_SEQUENCE_CONFIG, 0x02)
-        self.perform_single_ref_calibration(0x0)
-        self._register(SYSTEM_SEQUENCE_CONFIG, sequence_config)
+        # recal=False: caller restores a stored phase calibration instead.
+        if recal:
+            sequence_config = self._register(SYSTEM_SEQUENCE_CONFIG)
+            self._register(SYSTEM_SEQUENCE_CONFIG, 0x02)
+            self.perform_single_ref_calibration(0x0)
+            self._register(SYSTEM_SEQUENCE_CONFIG, sequence_config)
 
         return True
 
@@ -548,9 +690,9 @@ class VL53L0X():
 
     def get_vcsel_pulse_period(self, type):
         if type == self.vcsel_period_type[0]:
-            return self.decode_Vcsel_period(0x50)
+            return self.decode_Vcsel_period(self._register(PRE_RANGE_CONFIG_VCSEL_PERIOD))
         elif type == self.vcsel_period_type[1]:
-            return self.decode_Vcsel_period(0x70)
+            return self.decode_Vcsel_period(self._register(FINAL_RANGE_CONFIG_VCSEL_PERIOD))
         else:
             return 255
 
@@ -560,12 +702,12 @@ class VL53L0X():
         self.timeouts["msrc_dss_tcc_us"] = self.timeout_Mclks_to_microseconds(self.timeouts["msrc_dss_tcc_mclks"],
                                                                               self.timeouts[
                                                                                   "pre_range_vcsel_period_pclks"])
-        self.timeouts["pre_range_mclks"] = self.decode_timeout(PRE_RANGE_CONFIG_TIMEOUT_MACROP_HI)
+        self.timeouts["pre_range_mclks"] = self.decode_timeout(self._register(PRE_RANGE_CONFIG_TIMEOUT_MACROP_HI, struct='>H'))
         self.timeouts["pre_range_us"] = self.timeout_Mclks_to_microseconds(self.timeouts["pre_range_mclks"],
                                                                            self.timeouts[
                                                                                "pre_range_vcsel_period_pclks"])
         self.timeouts["final_range_vcsel_period_pclks"] = self.get_vcsel_pulse_period(self.vcsel_period_type[1])
-        self.timeouts["final_range_mclks"] = self.decode_timeout(self._register(FINAL_RANGE_CONFIG_TIMEOUT_MACROP_HI))
+        self.timeouts["final_range_mclks"] = self.decode_timeout(self._register(FINAL_RANGE_CONFIG_TIMEOUT_MACROP_HI, struct='>H'))
 
         if self.enables["pre_range"]:
             self.timeouts["final_range_mclks"] -= self.timeouts["pre_range_mclks"]
@@ -598,7 +740,7 @@ class VL53L0X():
             while (ls_byte & 0xFFFFFF00) > 0:
                 ls_byte >>= 1
                 ms_byte += 1
-            return (ms_byte << 8) or (ls_byte & 0xFF)
+            return (ms_byte << 8) | (ls_byte & 0xFF)
         else:
             return 0
 
@@ -638,7 +780,7 @@ class VL53L0X():
 
             if self.enables["pre_range"]:
                 final_range_timeout_mclks += self.timeouts["pre_range_mclks"]
-            self._register(FINAL_RANGE_CONFIG_TIMEOUT_MACROP_HI, self.encode_timeout(final_range_timeout_mclks))
+            self._register(FINAL_RANGE_CONFIG_TIMEOUT_MACROP_HI, self.encode_timeout(final_range_timeout_mclks), struct='>H')
             self.measurement_timing_budget_us = budget_us
         return True
 
@@ -651,10 +793,10 @@ class VL53L0X():
 
         # Instead of using the chrono class, I'll just capture the current time
         chrono_start = utime.ticks_ms()
-        while self._register((RESULT_INTERRUPT_STATUS & 0x07) == 0):
+        while (self._register(RESULT_INTERRUPT_STATUS) & 0x07) == 0:
 
             # elapsed time is juse the current time minus the start time.
-            time_elapsed = utime.ticks_ms() - chrono_start
+            time_elapsed = utime.ticks_diff(utime.ticks_ms(), chrono_start)
             if time_elapsed > _IO_TIMEOUT:
                 return False
         self._register(SYSTEM_INTERRUPT_CLEAR, 0x01)
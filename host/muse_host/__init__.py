@@ -0,0 +1,28 @@
+# muse_host
+# Commentarii Latine: bibliotheca hospitis pro protocollo MUSE (CPython, asyncio).
+"""
+Host side of the MUSE protocol (see protocol.md): asyncio UDP / serial
+readers, per-device state with NumPy telemetry rings, command sender,
+clock sync, binary frame decoding and session recording/replay.
+"""
+from .protocol import DEFAULT_PORT, JSON_PREFIX, BIN_PREFIX, encode_line, parse_line, parse_datagram
+from .ring import FIELDS, TelemetryRing
+from .device import DeviceState
+from .client import MuseClient
+from .recording import RecordWriter, Recording, replay
+
+__all__ = [
+    "DEFAULT_PORT",
+    "JSON_PREFIX",
+    "BIN_PREFIX",
+    "encode_line",
+    "parse_line",
+    "parse_datagram",
+    "FIELDS",
+    "TelemetryRing",
+    "DeviceState",
+    "MuseClient",
+    "RecordWriter",
+    "Recording",
+    "replay",
+]
@@ -0,0 +1,54 @@
+# __main__.py
+# Commentarii Latine: auscultat et numerat nuntios per machinam (vel contra machinas fictas).
+#
+#   python -m muse_host                       # listen on 7777, print rates
+#   python -m muse_host --standin 8 --rate 800 --seconds 5
+import argparse
+import asyncio
+import time
+
+from . import standin
+from .client import MuseClient
+from .protocol import DEFAULT_PORT
+
+
+async def _run(a):
+    client = MuseClient(ring_capacity=a.ring)
+    host, port = (await client.listen_udp(a.bind, a.port))[:2]
+    print("listening on %s:%d" % (host, port))
+    devs = []
+    if a.standin:
+        devs = await standin.start(("127.0.0.1", port), a.rate, a.standin)
+        for d in devs:
+            asyncio.ensure_future(d.run(a.seconds))
+
+    t0 = time.monotonic()
+    last = 0
+    try:
+        while a.seconds is None or time.monotonic() - t0 < a.seconds:
+            await asyncio.sleep(1.0)
+            n = client.rx_messages
+            print("%7d msg/s  %d devices  %d dup" % (
+                n - last, len(client.devices), sum(d.duplicates for d in client.devices.values())))
+            last = n
+    finally:
+        client.close()
+    dt = time.monotonic() - t0
+    sent = sum(d.sent for d in devs)
+    print("received %d messages in %.1f s (%.0f/s)%s" % (
+        client.rx_messages, dt, client.rx_messages / dt, ", stand-ins sent %d" % sent if devs else ""))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m muse_host", description="Listen to MUSE nodes and report rates.")
+    ap.add_argument("--bind", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--ring", type=int, default=4096, help="telemetry rows kept per device")
+    ap.add_argument("--standin", type=int, default=0, help="start N local fake nodes sending here")
+    ap.add_argument("--rate", type=float, default=500.0, help="stand-in messages per second per node")
+    ap.add_argument("--seconds", type=float, default=None)
+    asyncio.run(_run(ap.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# binframe.py
+# Commentarii Latine: hospes nuntios binarios (@MUSE#B=) in dict convertit.
+#
+# Host decoder for esp32/binframe.py. Ask for binary frames by sending
+# {"cmd":"bin","on":1} from the socket that will receive them:
+#
+#   python -m muse_host.binframe 192.168.4.1
+import socket
+import struct
+import sys
+import time
+
+from .protocol import BIN_PREFIX, encode_line, parse_datagram
+
+# Device forgets clients that stayed silent for 3 min (interface.CLIENT_TTL_MS).
+KEEPALIVE_S = 60
+
+BIN_VERSION = 1
+
+# Must match esp32/binframe.py (see protocol.md, "Binary sensor frames").
+BIN_FMT = "<BBIHHhhhhhhhhh"
+BIN_SIZE = struct.calcsize(BIN_FMT)
+_BIN = struct.Struct(BIN_FMT)
+
+F_DIST0 = 0x01
+F_DIST1 = 0x02
+F_IMU = 0x04
+F_TEMP = 0x08
+
+DIST_NONE = 0xFFFF
+
+SCALE_RAD = 10000.0
+SCALE_G = 10000.0
+SCALE_DPS = 100.0
+SCALE_C = 100.0
+
+
+def decode(frame):
+    """
+    One binary frame (with or without prefix) -> dict shaped like the NDJSON
+    sensor message ("distance_mm" is a list when the second slot is set).
+    Raises ValueError on a wrong size or unknown version.
+    """
+    mv = memoryview(frame)
+    if bytes(mv[:len(BIN_PREFIX)]) == BIN_PREFIX:
+        mv = mv[len(BIN_PREFIX):]
+    if len(mv) < BIN_SIZE:
+        raise ValueError("short frame: %d bytes" % len(mv))
+    if mv[0] != BIN_VERSION:
+        raise ValueError("unknown frame version %d" % mv[0])
+    (_, flags, ts, d0, d1, pitch, roll,
+     ax, ay, az, gx, gy, gz, tc) = _BIN.unpack_from(mv)
+
+    out = {"type": "sensor", "ts_ms": ts}
+    dist0 = d0 if flags & F_DIST0 else None
+    if flags & F_DIST1:
+        out["distance_mm"] = [dist0, d1]
+    else:
+        out["distance_mm"] = dist0
+    if flags & F_IMU:
+        out["tilt"] = {"pitch_rad": pitch / SCALE_RAD, "roll_rad": roll / SCALE_RAD}
+        out["accel_g"] = {"x": ax / SCALE_G, "y": ay / SCALE_G, "z": az / SCALE_G}
+        out["gyro_dps"] = {"x": gx / SCALE_DPS, "y": gy / SCALE_DPS, "z": gz / SCALE_DPS}
+    out["temp_c"] = tc / SCALE_C if flags & F_TEMP else None
+    return out
+
+
+def _i16(v, scale):
+    v = int(round(v * scale))
+    return 32767 if v > 32767 else (-32768 if v < -32768 else v)
+
+
+def _mm(v):
+    return DIST_NONE if v is None else max(0, min(DIST_NONE - 1, int(v)))
+
+
+def encode(obj):
+    """
+    Sensor message dict -> frame with prefix, packed like the firmware
+    (esp32/binframe.py). For the stand-in and for replays.
+    """
+    d = obj.get("distance_mm")
+    if isinstance(d, list):
+        d0 = d[0] if d else None
+        d1 = d[1] if len(d) > 1 else None
+    else:
+        d0, d1 = d, None
+    flags = (F_DIST0 if d0 is not None else 0) | (F_DIST1 if d1 is not None else 0)
+    imu = (0,) * 8
+    try:
+        t, a, g = obj["tilt"], obj["accel_g"], obj["gyro_dps"]
+        imu = (
+            _i16(t["pitch_rad"], SCALE_RAD), _i16(t["roll_rad"], SCALE_RAD),
+            _i16(a["x"], SCALE_G), _i16(a["y"], SCALE_G), _i16(a["z"], SCALE_G),
+            _i16(g["x"], SCALE_DPS), _i16(g["y"], SCALE_DPS), _i16(g["z"], SCALE_DPS),
+        )
+        flags |= F_IMU
+    except (KeyError, TypeError, ValueError):
+        pass
+    tc = 0
+    if obj.get("temp_c") is not None:
+        tc = _i16(obj["temp_c"], SCALE_C)
+        flags |= F_TEMP
+    return BIN_PREFIX + _BIN.pack(
+        BIN_VERSION, flags, int(obj.get("ts_ms", 0)) & 0xFFFFFFFF, _mm(d0), _mm(d1), *imu, tc
+    )
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: python -m muse_host.binframe <device-ip> [port]")
+        return 2
+    addr = (argv[0], int(argv[1]) if len(argv) > 1 else 7777)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("0.0.0.0", 0))
+    sock.settimeout(1.0)
+    last = None
+    try:
+        while True:
+            if last is None or time.monotonic() - last >= KEEPALIVE_S:
+                sock.sendto(encode_line({"cmd": "bin", "on": 1}), addr)
+                last = time.monotonic()
+            try:
+                data, _ = sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            for obj in parse_datagram(data):
+                print(obj)
+    except KeyboardInterrupt:
+        sock.sendto(encode_line({"cmd": "bin", "on": 0}), addr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+# client.py
+# Commentarii Latine: cliens asyncio: UDP et serial legit, status servat, mandata mittit.
+import asyncio
+import time
+
+from .device import DeviceState
+from .protocol import BIN_PREFIX, DEFAULT_PORT, encode_line, parse_datagram
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client):
+        self.client = client
+
+    def datagram_received(self, data, addr):
+        self.client.feed(data, addr)
+
+    def error_received(self, exc):
+        self.client.rx_errors += 1
+
+
+class MuseClient:
+    """
+    Host side of the MUSE protocol on one asyncio loop. Every datagram or
+    serial line goes through feed(): prefix filter, parse, per-device
+    state (DeviceState: latest message per type + NumPy telemetry ring),
+    then subscriber queues. Devices are keyed by their UDP source address
+    or serial port name; send() routes commands back the same way.
+    """
+
+    def __init__(self, ring_capacity=4096, dedupe=True):
+        self.ring_capacity = ring_capacity
+        self.dedupe = dedupe
+        self.devices = {}
+        self.rx_datagrams = 0
+        self.rx_messages = 0
+        self.rx_errors = 0
+        self.dropped = 0          # messages a full subscriber queue could not take
+        self._queues = []
+        self._udp = None
+        self._serial = {}         # port -> (reader task, writer)
+        self._sync_waiters = {}   # seq -> future
+
+    # --- input
+    def feed(self, data, key, rx_time=None):
+        # One datagram / serial line from device `key`; returns messages applied.
+        if rx_time is None:
+            rx_time = time.monotonic()
+        self.rx_datagrams += 1
+        msgs = parse_datagram(data)
+        if not msgs:
+            return 0
+        binary = data.startswith(BIN_PREFIX)
+        dev = self.devices.get(key)
+        if dev is None:
+            dev = self.devices[key] = DeviceState(key, self.ring_capacity, self.dedupe)
+        n = 0
+        for msg in msgs:
+            if not isinstance(msg, dict) or not dev.update(msg, rx_time, binary):
+                continue
+            n += 1
+            if msg.get("type") == "sync":
+                fut = self._sync_waiters.pop(msg.get("seq"), None)
+                if fut is not None and not fut.done():
+                    fut.set_result((msg, time.time_ns() // 1000))   # sync.now_us()
+            for q in self._queues:
+                try:
+                    q.put_nowait((key, msg))
+                except asyncio.QueueFull:
+                    self.dropped += 1
+        self.rx_messages += n
+        return n
+
+    def subscribe(self, maxsize=1024):
+        # Queue of (device key, message); when it is full new messages are dropped.
+        q = asyncio.Queue(maxsize)
+        self._queues.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        if q in self._queues:
+            self._queues.remove(q)
+
+    async def listen_udp(self, host="0.0.0.0", port=DEFAULT_PORT):
+        # Bind to the device broadcast port (UDP_SEND_PORT) to hear every node.
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _UdpProtocol(self), local_addr=(host, port), allow_broadcast=True
+        )
+        self._udp = transport
+        return transport.get_extra_info("sockname")
+
+    async def open_serial(self, port, baudrate=115200):
+        # Needs pyserial-asyncio (the "serial" extra).
+        try:
+            import serial_asyncio
+        except ImportError:
+            raise ImportError("serial support needs pyserial-asyncio: pip install muse-host[serial]") from None
+        reader, writer = await serial_asyncio.open_serial_connection(url=port, baudrate=baudrate)
+        task = asyncio.ensure_future(self._read_serial(port, reader))
+        self._serial[port] = (task, writer)
+
+    async def _read_serial(self, port, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            self.feed(line, port)
+
+    # --- output
+    def send(self, key, obj):
+        # Command to one device (its key as in self.devices, or any (ip, port)).
+        if key in self._serial:
+            self._serial[key][1].write(encode_line(obj) + b"\n")
+            return
+        if self._udp is None:
+            raise RuntimeError("no UDP endpoint: call listen_udp() first")
+        self._udp.sendto(encode_line(obj), key)
+
+    async def command(self, key, cmd, **fields):
+        # send() plus a loop turn, so callers can await a batch of commands.
+        fields["cmd"] = cmd
+        self.send(key, fields)
+        await asyncio.sleep(0)
+
+    async def sync(self, key, rounds=8, timeout_s=0.5, apply=True):
+        """
+        asyncio version of sync.sync_once(): NTP rounds against one device,
+        best (offset_us, rtt_us, at_us) or None. With apply the device gets
+        the offset and starts adding host_ms (if CLOCK_HOST_TS is set).
+        """
+        from . import sync as _sync   # here so `python -m muse_host.sync` runs cleanly
+
+        loop = asyncio.get_running_loop()
+        results = []
+        base = _sync.now_us() & 0xFFFFFF
+        for i in range(rounds):
+            seq = base + i
+            fut = loop.create_future()
+            self._sync_waiters[seq] = fut
+            t0 = _sync.now_us()
+            self.send(key, {"cmd": "sync", "seq": seq, "t0_us": t0})
+            try:
+                reply, t3 = await asyncio.wait_for(fut, timeout_s)
+            except asyncio.TimeoutError:
+                self._sync_waiters.pop(seq, None)
+                continue
+            if reply.get("tx_us") is not None:
+                results.append(_sync.round_result(t0, int(reply["rx_us"]), int(reply["tx_us"]), t3))
+        best = _sync.estimate(results)
+        if best is not None and apply:
+            offset, rtt, at = best
+            self.send(key, {"cmd": "sync", "offset_us": offset, "at_us": at, "rtt_us": rtt})
+        return best
+
+    def close(self):
+        if self._udp is not None:
+            self._udp.close()
+            self._udp = None
+        for task, writer in self._serial.values():
+            task.cancel()
+            writer.close()
+        self._serial.clear()
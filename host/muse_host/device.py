@@ -0,0 +1,118 @@
+# device.py
+# Commentarii Latine: status unius machinae: ultimi nuntii, anulus, numeri.
+from .ring import TelemetryRing
+
+# Broadcast + unicast of the same message (a host that also sends commands
+# is a registered client) arrive twice, up to UDP_BATCH_MS apart when the
+# unicast copy is batched and later still when broadcasts wait for DTIM.
+# Copies are matched within this many ms of the newest ts_ms seen.
+DEDUPE_MS = 2000
+TS_PERIOD = 1 << 30   # device ticks_ms wraps here
+
+
+class DeviceState:
+    """
+    Everything known about one node, keyed by its source (UDP (ip, port) or
+    serial port name). latest maps message type -> newest message; sensor
+    messages also go into the NumPy ring.
+    """
+
+    def __init__(self, key, ring_capacity=4096, dedupe=True):
+        self.key = key
+        self.latest = {}
+        self.ring = TelemetryRing(ring_capacity)
+        self.messages = 0
+        self.duplicates = 0
+        self.upgraded = 0     # binary-frame samples replaced by their NDJSON copy
+        self.last_rx = None
+        self.dedupe = bool(dedupe)
+        # (type, ts_ms) -> messages, last DEDUPE_MS only; for sensor keys
+        # [msg, from_binary, ring position, rx_time] instead
+        self._recent = {}
+        self._hw = None       # newest ts_ms seen
+        self._pruned = None   # _hw at the last prune
+
+    def _seen(self, msg):
+        # -> (duplicate?, sensor entry or None).
+        # Sensor messages: one per ts_ms per device (telemetry stays well
+        # under 1 kHz), and the copies need not be equal: with binary on,
+        # the unicast frame is a quantised version of the broadcast line.
+        # Other types: a duplicate is the identical message, as several
+        # events can share a millisecond.
+        ts = msg.get("ts_ms")
+        if not isinstance(ts, int):
+            return False, None
+        if self._hw is None:
+            self._hw = self._pruned = ts
+        else:
+            d = (ts - self._hw) % TS_PERIOD
+            if d < TS_PERIOD // 2:
+                self._hw = ts
+            elif TS_PERIOD - d > DEDUPE_MS:
+                # Far behind anything a copy could be: the device restarted.
+                self._recent.clear()
+                self._hw = self._pruned = ts
+        typ = msg.get("type")
+        sensor = typ == "sensor"
+        key = (typ, ts)
+        prev = self._recent.get(key)
+        if prev is None:
+            prev = self._recent[key] = [msg]
+        elif sensor:
+            return True, prev
+        elif msg in prev:
+            return True, None
+        else:
+            prev.append(msg)
+        self._prune()
+        return False, prev if sensor else None
+
+    def _prune(self):
+        # Every DEDUPE_MS of device time: forget keys older than that.
+        hw = self._hw
+        if (hw - self._pruned) % TS_PERIOD < DEDUPE_MS:
+            return
+        self._pruned = hw
+        old = [k for k in self._recent if (hw - k[1]) % TS_PERIOD > DEDUPE_MS]
+        for k in old:
+            del self._recent[k]
+
+    def update(self, msg, rx_time, binary=False):
+        """
+        Apply one message; binary=True if it came from a binframe. False for
+        a duplicate. Over Wi-Fi the unicast frame often beats the broadcast
+        line (broadcasts wait for DTIM); the line is kept instead then,
+        since it has full precision and the fields a frame lacks (imu_win,
+        host_ms, age_ms): latest and the ring row are replaced, rx_time of
+        the first copy is kept. Subscribers only ever get the first copy.
+        """
+        entry = None
+        if self.dedupe:
+            dup, entry = self._seen(msg)
+            if dup:
+                self.duplicates += 1
+                if entry is not None and entry[1] and not binary:
+                    self._upgrade(entry, msg)
+                return False
+        self.messages += 1
+        self.last_rx = rx_time
+        typ = msg.get("type")
+        self.latest[typ] = msg
+        if typ == "sensor":
+            pos = self.ring.append(msg, rx_time)
+            if entry is not None:
+                entry[1:] = [binary, pos, rx_time]
+        return True
+
+    def _upgrade(self, entry, msg):
+        old = entry[0]
+        entry[0] = msg
+        entry[1] = False
+        if self.latest.get("sensor") is old:
+            self.latest["sensor"] = msg
+        self.ring.replace(entry[2], msg, entry[3])
+        self.upgraded += 1
+
+    @property
+    def sensor(self):
+        return self.latest.get("sensor")
@@ -0,0 +1,74 @@
+# protocol.py
+# Commentarii Latine: lineae @MUSE#J= et mandata, ex parte hospitis.
+#
+# Wire format in protocol.md. Datagrams may carry one line, several
+# "\n"-terminated lines (batching) or one binary frame (@MUSE#B=).
+import json
+
+JSON_PREFIX = b"@MUSE#J="
+BIN_PREFIX = b"@MUSE#B="
+DEFAULT_PORT = 7777
+
+try:
+    import orjson   # optional, ~3x faster loads; install the "fast" extra
+    _loads = orjson.loads
+    _JSONError = orjson.JSONDecodeError
+except ImportError:
+    _loads = json.loads
+    _JSONError = ValueError
+
+_LP = len(JSON_PREFIX)
+
+
+def encode_line(obj):
+    # One protocol line, commands and stand-in telemetry (no newline).
+    return JSON_PREFIX + json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def parse_line(line):
+    """
+    One line (bytes) -> dict/list, or None for non-protocol input. The
+    prefix is checked on the raw bytes, so noise is rejected before any
+    decoding. Raises ValueError on a prefixed line with broken JSON.
+    """
+    if not line.startswith(JSON_PREFIX):
+        line = line.strip()
+        if not line.startswith(JSON_PREFIX):
+            return None
+    try:
+        return _loads(line[_LP:])
+    except _JSONError as e:
+        raise ValueError(str(e)) from None
+
+
+def parse_datagram(data, errors=None):
+    """
+    Datagram (or serial line) -> list of messages. Broken lines are
+    skipped; if `errors` is a list they are appended to it as (line, reason).
+    """
+    if data.startswith(BIN_PREFIX):
+        # Imported here so `python -m muse_host.binframe` runs cleanly.
+        from .binframe import decode
+
+        try:
+            return [decode(data)]
+        except ValueError as e:
+            if errors is not None:
+                errors.append((data, str(e)))
+            return []
+    # Fast path: a single line (the default, unbatched case).
+    end = len(data) - 1
+    lines = (data,) if data.find(b"\n", 0, end) < 0 else data.split(b"\n")
+    out = []
+    for line in lines:
+        if not line:
+            continue
+        try:
+            obj = parse_line(line)
+        except ValueError as e:
+            if errors is not None:
+                errors.append((line, str(e)))
+            continue
+        if obj is not None:
+            out.append(obj)
+    return out
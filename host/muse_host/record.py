@@ -0,0 +1,89 @@
+# record.py
+# Commentarii Latine: nuntios crudos ex UDP vel serial in tabulam scribit.
+#
+#   python -m muse_host.record session.mrec                       # UDP 7777
+#   python -m muse_host.record session.mrec --serial /dev/ttyUSB0 --seconds 600
+#
+# Replay with python -m muse_host.replay (format in recording.py).
+import argparse
+import asyncio
+import time
+
+from .protocol import DEFAULT_PORT
+from .recording import RecordWriter, is_protocol
+
+
+class _UdpRecorder(asyncio.DatagramProtocol):
+    def __init__(self, writer):
+        self.writer = writer
+
+    def datagram_received(self, data, addr):
+        if is_protocol(data):
+            self.writer.write(data, addr)
+
+
+async def _read_serial(writer, port, baudrate):
+    try:
+        import serial_asyncio
+    except ImportError:
+        raise ImportError("serial support needs pyserial-asyncio: pip install muse-host[serial]") from None
+    reader, _ = await serial_asyncio.open_serial_connection(url=port, baudrate=baudrate)
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        if is_protocol(line):
+            writer.write(line, port)
+
+
+async def _run(a, writer):
+    loop = asyncio.get_running_loop()
+    tasks = []
+    transport = None
+    if a.serial:
+        for port in a.serial:
+            tasks.append(asyncio.ensure_future(_read_serial(writer, port, a.baud)))
+            print("recording %s" % port)
+    if a.port or not a.serial:
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _UdpRecorder(writer), local_addr=(a.bind, a.port or DEFAULT_PORT), allow_broadcast=True
+        )
+        print("recording UDP %s:%d" % transport.get_extra_info("sockname")[:2])
+    t0 = time.monotonic()
+    last = 0
+    try:
+        while a.seconds is None or time.monotonic() - t0 < a.seconds:
+            await asyncio.sleep(1.0)
+            if tasks and all(t.done() for t in tasks) and transport is None:
+                break
+            print("%7d rec/s  %d total  %d KiB" % (writer.records - last, writer.records, writer.bytes >> 10))
+            last = writer.records
+    finally:
+        if transport is not None:
+            transport.close()
+        for t in tasks:
+            t.cancel()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m muse_host.record",
+                                 description="Record raw MUSE traffic with receive timestamps.")
+    ap.add_argument("path", help="output file (.mrec)")
+    ap.add_argument("--bind", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=None, help="UDP port (default %d unless --serial)" % DEFAULT_PORT)
+    ap.add_argument("--serial", action="append", help="serial port to record (repeatable)")
+    ap.add_argument("--baud", type=int, default=115200)
+    ap.add_argument("--seconds", type=float, default=None)
+    a = ap.parse_args(argv)
+    writer = RecordWriter(a.path)
+    try:
+        asyncio.run(_run(a, writer))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+    print("%d records, %d bytes -> %s" % (writer.records, writer.bytes, a.path))
+
+
+if __name__ == "__main__":
+    main()
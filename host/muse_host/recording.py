@@ -0,0 +1,220 @@
+# recording.py
+# Commentarii Latine: tabula nuntiorum crudorum cum temporibus receptionis et indice.
+#
+# File layout (little-endian):
+#   header   "MUSEREC1", Q start epoch µs
+#   records  Q t_us (since start), H source id, H length, <length> raw bytes
+#            source id SRC_DEFINE: bytes are the name of the next source id
+#   index    I count, count x (Q t_us, Q file offset), written on close
+#   footer   Q index offset, "MUSEIDX1"
+# A file without footer (recorder killed) is still readable; the index is
+# rebuilt by one scan.
+import socket
+import struct
+import time
+
+from .protocol import BIN_PREFIX, JSON_PREFIX
+
+MAGIC = b"MUSEREC1"
+IDX_MAGIC = b"MUSEIDX1"
+SRC_DEFINE = 0xFFFF
+INDEX_EVERY_US = 1_000_000   # one seek point per second of recording
+
+_HDR = struct.Struct("<8sQ")
+_REC = struct.Struct("<QHH")
+_IDX = struct.Struct("<QQ")
+_FOOT = struct.Struct("<Q8s")
+
+
+def _src_name(src):
+    if isinstance(src, tuple):
+        return "%s:%d" % src[:2]
+    return str(src)
+
+
+class RecordWriter:
+    """
+    Appends raw datagrams / serial lines with their receive time. Sources
+    (UDP address, serial port) get small ids on first use.
+    """
+
+    def __init__(self, path, start_us=None):
+        self.path = path
+        self.start_us = time.time_ns() // 1000 if start_us is None else int(start_us)
+        self._t0 = time.monotonic_ns() // 1000 - (time.time_ns() // 1000 - self.start_us)
+        self._f = open(path, "wb")
+        self._f.write(_HDR.pack(MAGIC, self.start_us))
+        self._src = {}
+        self._index = []
+        self._next_idx = 0
+        self.records = 0
+        self.bytes = 0
+
+    def _now_us(self):
+        return time.monotonic_ns() // 1000 - self._t0
+
+    def write(self, data, src, t_us=None):
+        t = self._now_us() if t_us is None else int(t_us)
+        f = self._f
+        sid = self._src.get(src)
+        if sid is None:
+            sid = self._src[src] = len(self._src)
+            name = _src_name(src).encode("utf-8")
+            f.write(_REC.pack(t, SRC_DEFINE, len(name)))
+            f.write(name)
+        if t >= self._next_idx:
+            self._index.append((t, f.tell()))
+            self._next_idx = t + INDEX_EVERY_US
+        data = bytes(data[:0xFFFF])
+        f.write(_REC.pack(t, sid, len(data)))
+        f.write(data)
+        self.records += 1
+        self.bytes += len(data)
+
+    def close(self):
+        if self._f is None:
+            return
+        f = self._f
+        at = f.tell()
+        f.write(struct.pack("<I", len(self._index)))
+        for t, off in self._index:
+            f.write(_IDX.pack(t, off))
+        f.write(_FOOT.pack(at, IDX_MAGIC))
+        f.close()
+        self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    """
+    Read side. sources maps id -> name; duration_us is the last record time.
+    records(start_us, end_us) yields (t_us, source id, bytes) in order,
+    jumping to start_us through the index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, self.start_us = _HDR.unpack(f.read(_HDR.size))
+            if magic != MAGIC:
+                raise ValueError("%s: not a MUSE recording" % path)
+            f.seek(0, 2)
+            size = f.tell()
+            self._end = size
+            self.index = None
+            if size >= _HDR.size + _FOOT.size:
+                f.seek(size - _FOOT.size)
+                at, m = _FOOT.unpack(f.read(_FOOT.size))
+                if m == IDX_MAGIC:
+                    f.seek(at)
+                    (n,) = struct.unpack("<I", f.read(4))
+                    raw = f.read(n * _IDX.size)
+                    self.index = [_IDX.unpack_from(raw, i * _IDX.size) for i in range(n)]
+                    self._end = at
+        self.sources = {}
+        self.duration_us = 0
+        self.count = 0
+        self._scan()
+
+    def _scan(self):
+        # One pass: source table, duration, count (and the index if missing).
+        build = self.index is None
+        if build:
+            self.index = []
+        nxt = 0
+        nsrc = 0
+        for t, sid, data, off in self._iter(_HDR.size, raw=True):
+            if sid == SRC_DEFINE:
+                self.sources[nsrc] = data.decode("utf-8", "replace")
+                nsrc += 1
+                continue
+            if build and t >= nxt:
+                self.index.append((t, off))
+                nxt = t + INDEX_EVERY_US
+            self.duration_us = t
+            self.count += 1
+
+    def _iter(self, offset, raw=False):
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            end = self._end
+            pos = offset
+            hdr = _REC.size
+            while pos + hdr <= end:
+                b = f.read(hdr)
+                if len(b) < hdr:
+                    return
+                t, sid, n = _REC.unpack(b)
+                data = f.read(n)
+                if len(data) < n:
+                    return   # truncated tail (recorder killed mid-write)
+                if raw:
+                    yield t, sid, data, pos
+                elif sid != SRC_DEFINE:
+                    yield t, sid, data
+                pos += hdr + n
+
+    def records(self, start_us=0, end_us=None):
+        off = _HDR.size
+        for t, o in self.index:
+            if t > start_us:
+                break
+            off = o
+        for t, sid, data in self._iter(off):
+            if t < start_us:
+                continue
+            if end_us is not None and t > end_us:
+                return
+            yield t, sid, data
+
+
+def is_protocol(data):
+    # Only protocol traffic is kept (serial boot noise, REPL output, ...).
+    return data.startswith(JSON_PREFIX) or data.startswith(BIN_PREFIX) or \
+        data.lstrip().startswith(JSON_PREFIX)
+
+
+def replay(rec, target, speed=1.0, start_us=0, end_us=None, bind="0.0.0.0"):
+    """
+    Send the records of `rec` to the UDP `target` with their recorded
+    spacing divided by `speed` (0 = as fast as possible). Each source gets
+    its own socket, so a receiver still sees one device per recorded node.
+    Datagrams are sent as recorded (batches stay batches). Returns
+    (sent, elapsed_s, max_lag_s); lag is how late a record went out.
+    """
+    socks = {}
+    sent = 0
+    max_lag = 0.0
+    t_first = None
+    wall0 = time.perf_counter()
+    try:
+        for t, sid, data in rec.records(start_us, end_us):
+            s = socks.get(sid)
+            if s is None:
+                s = socks[sid] = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                s.bind((bind, 0))
+            if speed > 0:
+                if t_first is None:
+                    t_first = t
+                    wall0 = time.perf_counter()
+                due = wall0 + (t - t_first) / 1e6 / speed
+                wait = due - time.perf_counter()
+                if wait > 0.002:
+                    time.sleep(wait - 0.001)
+                # last millisecond spun: sleep() alone is too coarse at 10-100x
+                while time.perf_counter() < due:
+                    pass
+                lag = time.perf_counter() - due
+                if lag > max_lag:
+                    max_lag = lag
+            s.sendto(data, target)
+            sent += 1
+    finally:
+        for s in socks.values():
+            s.close()
+    return sent, time.perf_counter() - wall0, max_lag
@@ -0,0 +1,48 @@
+# replay.py
+# Commentarii Latine: tabulam ad portum UDP reddit, tempore servato vel acto.
+#
+#   python -m muse_host.replay session.mrec --info
+#   python -m muse_host.replay session.mrec --target 127.0.0.1:7777           # 1x
+#   python -m muse_host.replay session.mrec --speed 50 --start 120 --end 180   # 50x, one minute
+#   python -m muse_host.replay session.mrec --speed max --loop 10              # parser throughput
+import argparse
+
+from .protocol import DEFAULT_PORT
+from .recording import Recording, replay
+
+
+def _info(rec):
+    dur = rec.duration_us / 1e6
+    print("%s: %d records, %.1f s, %.1f rec/s" % (rec.path, rec.count, dur, rec.count / dur if dur else 0.0))
+    for sid, name in sorted(rec.sources.items()):
+        print("  source %d: %s" % (sid, name))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m muse_host.replay",
+                                 description="Replay a MUSE recording to a UDP port.")
+    ap.add_argument("path")
+    ap.add_argument("--target", default="127.0.0.1:%d" % DEFAULT_PORT, help="host:port")
+    ap.add_argument("--speed", default="1", help="time factor (1, 10, 100, ...) or 'max'")
+    ap.add_argument("--start", type=float, default=0.0, help="seek: seconds into the recording")
+    ap.add_argument("--end", type=float, default=None, help="stop at this many seconds in")
+    ap.add_argument("--loop", type=int, default=1, help="play the range this many times")
+    ap.add_argument("--info", action="store_true", help="print sources and duration, send nothing")
+    a = ap.parse_args(argv)
+
+    rec = Recording(a.path)
+    _info(rec)
+    if a.info:
+        return
+    speed = 0.0 if a.speed == "max" else float(a.speed)
+    host, _, port = a.target.rpartition(":")
+    target = (host or "127.0.0.1", int(port))
+    end_us = None if a.end is None else int(a.end * 1e6)
+    for i in range(a.loop):
+        sent, dt, lag = replay(rec, target, speed, int(a.start * 1e6), end_us)
+        print("pass %d: %d sent in %.2f s (%.0f/s), max lag %.1f ms" % (
+            i + 1, sent, dt, sent / dt if dt else 0.0, lag * 1e3))
+
+
+if __name__ == "__main__":
+    main()
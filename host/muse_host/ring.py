@@ -0,0 +1,91 @@
+# ring.py
+# Commentarii Latine: anulus telemetriae in NumPy (ultimae N mensurae per machinam).
+import numpy as np
+
+# One row per sensor message; NaN where the message had no value.
+FIELDS = (
+    "rx_time",      # host receive time, time.monotonic() seconds
+    "ts_ms",        # device ticks_ms (wraps every ~12.4 days)
+    "dist0_mm",
+    "dist1_mm",
+    "pitch_rad",
+    "roll_rad",
+    "ax_g",
+    "ay_g",
+    "az_g",
+    "gx_dps",
+    "gy_dps",
+    "gz_dps",
+    "temp_c",
+)
+COL = {name: i for i, name in enumerate(FIELDS)}
+
+_NAN = float("nan")
+
+
+def _f(v):
+    return _NAN if v is None else v
+
+
+def sensor_row(msg, rx_time):
+    # Sensor message (NDJSON or decoded binary frame) -> row tuple in FIELDS order.
+    d = msg.get("distance_mm")
+    if isinstance(d, list):
+        d0 = d[0] if d else None
+        d1 = d[1] if len(d) > 1 else None
+    else:
+        d0, d1 = d, None
+    t = msg.get("tilt") or {}
+    a = msg.get("accel_g") or {}
+    g = msg.get("gyro_dps") or {}
+    return (
+        rx_time, _f(msg.get("ts_ms")), _f(d0), _f(d1),
+        _f(t.get("pitch_rad")), _f(t.get("roll_rad")),
+        _f(a.get("x")), _f(a.get("y")), _f(a.get("z")),
+        _f(g.get("x")), _f(g.get("y")), _f(g.get("z")),
+        _f(msg.get("temp_c")),
+    )
+
+
+class TelemetryRing:
+    """
+    Fixed-size float64 ring of sensor rows, one preallocated (capacity,
+    len(FIELDS)) array. append() is one row assignment; readers get
+    chronological copies, so they never see a row being overwritten.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = int(capacity)
+        self.data = np.full((self.capacity, len(FIELDS)), np.nan)
+        self.total = 0   # rows ever appended
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, msg, rx_time):
+        # Returns the row's position (for replace()).
+        self.data[self.total % self.capacity] = sensor_row(msg, rx_time)
+        self.total += 1
+        return self.total - 1
+
+    def replace(self, pos, msg, rx_time):
+        # Overwrite row `pos` (from append()) if it is still held.
+        if 0 <= pos < self.total and self.total - pos <= self.capacity:
+            self.data[pos % self.capacity] = sensor_row(msg, rx_time)
+            return True
+        return False
+
+    def last(self, n=None):
+        # Newest n rows (default: all held), oldest first.
+        held = len(self)
+        n = held if n is None else min(int(n), held)
+        if n <= 0:
+            return self.data[:0].copy()
+        end = self.total % self.capacity
+        start = end - n
+        if start >= 0:
+            return self.data[start:end].copy()
+        return np.concatenate((self.data[start:], self.data[:end]))
+
+    def column(self, name, n=None):
+        return self.last(n)[:, COL[name]]
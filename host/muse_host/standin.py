@@ -0,0 +1,147 @@
+# standin.py
+# Commentarii Latine: machina ficta in UDP, pro probationibus sine ferramentis.
+#
+# Local stand-in for an ESP32 node: sends synthetic sensor telemetry to a
+# UDP target (like the device broadcast) and to every client that wrote to
+# it, and answers the interface-level commands (sync, bin, batch). Enough
+# to exercise MuseClient, the sync helper and host parsers on one machine.
+#
+#   python -m muse_host.standin --target 127.0.0.1:7777 --rate 1000 --nodes 4
+import argparse
+import asyncio
+import math
+import time
+
+from . import binframe
+from .protocol import encode_line, parse_datagram
+
+BATCH_BYTES = 1400   # firmware defaults: UDP_BATCH_BYTES, UDP_BATCH_MS
+BATCH_MS = 20
+
+
+class StandinDevice(asyncio.DatagramProtocol):
+    """One fake node. Telemetry shape matches Sensors.read() defaults."""
+
+    def __init__(self, target, rate_hz=100.0):
+        self.target = target
+        self.period = 1.0 / rate_hz
+        self.clients = set()
+        self.binary = set()
+        self.batched = set()
+        self.sent = 0
+        self.transport = None
+        self._t0 = time.monotonic()
+        self._batch = bytearray()
+        self._flushed = self._t0
+
+    # device clocks: ticks_ms and unwrapped µs since "boot"
+    def _ms(self, t=None):
+        return int(((time.monotonic() if t is None else t) - self._t0) * 1000) & 0x3FFFFFFF
+
+    def _us(self):
+        return int((time.monotonic() - self._t0) * 1_000_000)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        rx = self._us()
+        self.clients.add(addr)
+        for msg in parse_datagram(data):
+            if not isinstance(msg, dict):
+                continue
+            c = msg.get("cmd")
+            on = bool(msg.get("on", 1))
+            if c == "sync" and "offset_us" not in msg:
+                reply = {"type": "sync", "seq": msg.get("seq"), "t0_us": msg.get("t0_us"),
+                         "rx_us": rx, "offset_us": None, "drift_ppb": 0, "tx_us": self._us()}
+                self.transport.sendto(encode_line(reply), addr)
+            elif c == "bin":
+                (self.binary.add if on else self.binary.discard)(addr)
+            elif c == "batch":
+                (self.batched.add if on else self.batched.discard)(addr)
+
+    def sample(self, at=None):
+        # at: scheduled monotonic time, so catch-up bursts keep distinct ts_ms
+        at = time.monotonic() if at is None else at
+        t = at - self._t0
+        s = math.sin(t)
+        return {
+            "type": "sensor",
+            "ts_ms": self._ms(at),
+            "distance_mm": int(500 + 300 * s),
+            "tilt": {"pitch_rad": 0.4 * s, "roll_rad": 1.9 + 0.1 * math.cos(t)},
+            "accel_g": {"x": 0.4 * s, "y": 0.85, "z": -0.36},
+            "gyro_dps": {"x": 5.0 * math.cos(t), "y": -1.6, "z": -0.5},
+            "temp_c": 36.4,
+        }
+
+    def emit(self, obj):
+        line = encode_line(obj)
+        frame = binframe.encode(obj) if self.binary else None
+        self.transport.sendto(line, self.target)
+        for addr in self.clients:
+            if frame is not None and addr in self.binary:
+                self.transport.sendto(frame, addr)
+            elif addr in self.batched:
+                if len(self._batch) + len(line) + 1 > BATCH_BYTES:
+                    self.flush()
+                self._batch += line + b"\n"
+            else:
+                self.transport.sendto(line, addr)
+        self.sent += 1
+
+    def flush(self):
+        self._flushed = time.monotonic()
+        if self._batch:
+            for addr in self.batched:
+                self.transport.sendto(bytes(self._batch), addr)
+            self._batch.clear()
+
+    async def run(self, seconds=None):
+        # Fixed-rate schedule; catches up in bursts if the loop falls behind.
+        next_t = time.monotonic()
+        end = None if seconds is None else next_t + seconds
+        while end is None or next_t < end:
+            now = time.monotonic()
+            while next_t <= now:
+                self.emit(self.sample(next_t))
+                next_t += self.period
+            if time.monotonic() - self._flushed >= BATCH_MS / 1000:
+                self.flush()
+            await asyncio.sleep(max(0.0, next_t - time.monotonic()))
+        self.flush()
+
+
+async def start(target, rate_hz=100.0, nodes=1, host="127.0.0.1", port=0):
+    # Start `nodes` stand-ins (own source port each); returns the protocols.
+    loop = asyncio.get_running_loop()
+    devs = []
+    for i in range(nodes):
+        _, dev = await loop.create_datagram_endpoint(
+            lambda: StandinDevice(target, rate_hz), local_addr=(host, port + i if port else 0)
+        )
+        devs.append(dev)
+    return devs
+
+
+async def _main(a):
+    host, _, port = a.target.rpartition(":")
+    devs = await start((host or "127.0.0.1", int(port)), a.rate, a.nodes)
+    for d in devs:
+        print("stand-in at %s:%d" % d.transport.get_extra_info("sockname")[:2])
+    await asyncio.gather(*(d.run(a.seconds) for d in devs))
+    print("sent", sum(d.sent for d in devs), "messages")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Fake MUSE node(s) on UDP.")
+    ap.add_argument("--target", default="127.0.0.1:7777", help="where telemetry goes (host:port)")
+    ap.add_argument("--rate", type=float, default=100.0, help="sensor messages per second per node (ts_ms is per ms: keep <= 1000)")
+    ap.add_argument("--nodes", type=int, default=1)
+    ap.add_argument("--seconds", type=float, default=None)
+    asyncio.run(_main(ap.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# sync.py
+# Commentarii Latine: hospes horologium machinae metitur (NTP modo) et correctionem mittit.
+#
+# Host side of {"cmd":"sync"}. Runs a few ping/pong rounds over UDP, keeps
+# the round with the smallest round trip, and sends the resulting offset
+# back so the device can stamp telemetry with host epoch time ("host_ms",
+# pins_io.CLOCK_HOST_TS). MuseClient.sync() is the asyncio equivalent.
+#
+#   python -m muse_host.sync 192.168.4.1
+#   python -m muse_host.sync 192.168.4.1 --rounds 16 --every 60
+import argparse
+import socket
+import time
+
+from .protocol import DEFAULT_PORT as PORT, encode_line, parse_datagram
+
+
+def now_us():
+    # Host epoch µs; the device reports host_ms on this scale.
+    return time.time_ns() // 1000
+
+
+def round_result(t0, t1, t2, t3):
+    """
+    One NTP exchange. t0/t3 host send/receive, t1/t2 device receive/send
+    (device µs). Returns (offset_us, rtt_us, at_us): host_us - device_us,
+    time on the wire, and the device instant the offset belongs to.
+    """
+    offset = ((t0 - t1) + (t3 - t2)) // 2
+    rtt = (t3 - t0) - (t2 - t1)
+    return offset, rtt, (t1 + t2) // 2
+
+
+def estimate(results):
+    # Smallest round trip wins: least room for asymmetric queueing delay.
+    return min(results, key=lambda r: r[1]) if results else None
+
+
+def _send(sock, addr, obj):
+    sock.sendto(encode_line(obj), addr)
+
+
+def _wait_reply(sock, seq, deadline):
+    while True:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            return None, None
+        sock.settimeout(left)
+        try:
+            data, _ = sock.recvfrom(2048)
+        except socket.timeout:
+            return None, None
+        t3 = now_us()
+        for obj in parse_datagram(data):
+            if isinstance(obj, dict) and obj.get("type") == "sync" and obj.get("seq") == seq:
+                return obj, t3
+
+
+def sync_rounds(sock, addr, rounds=8, timeout_s=0.5, gap_s=0.02):
+    """
+    Ping the device `rounds` times; returns the list of round_result()
+    tuples for the rounds that got an answer (telemetry in between is
+    skipped). Sequence numbers start at a random-ish base so replies to an
+    earlier run cannot be mistaken for ours.
+    """
+    out = []
+    base = now_us() & 0xFFFFFF
+    for i in range(rounds):
+        seq = base + i
+        t0 = now_us()
+        _send(sock, addr, {"cmd": "sync", "seq": seq, "t0_us": t0})
+        reply, t3 = _wait_reply(sock, seq, time.monotonic() + timeout_s)
+        if reply is not None and reply.get("tx_us") is not None:
+            out.append(round_result(t0, int(reply["rx_us"]), int(reply["tx_us"]), t3))
+        time.sleep(gap_s)
+    return out
+
+
+def sync_once(sock, addr, rounds=8, timeout_s=0.5, apply=True):
+    # Measure, and (unless apply=False) hand the best estimate to the device.
+    best = estimate(sync_rounds(sock, addr, rounds, timeout_s))
+    if best is not None and apply:
+        offset, rtt, at = best
+        _send(sock, addr, {"cmd": "sync", "offset_us": offset, "at_us": at, "rtt_us": rtt})
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sync a MUSE device clock to this host.")
+    ap.add_argument("host", help="device IP")
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--rounds", type=int, default=8)
+    ap.add_argument("--timeout", type=float, default=0.5, help="seconds per reply")
+    ap.add_argument("--every", type=float, default=0, help="repeat every N s (lets the device fit drift)")
+    ap.add_argument("--dry-run", action="store_true", help="measure only, do not send the offset")
+    a = ap.parse_args(argv)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("0.0.0.0", 0))
+    addr = (a.host, a.port)
+    while True:
+        best = sync_once(sock, addr, a.rounds, a.timeout, apply=not a.dry_run)
+        if best is None:
+            print("no sync replies from %s:%d" % addr)
+        else:
+            offset, rtt, at = best
+            print("offset_us=%d rtt_us=%d at_us=%d" % (offset, rtt, at))
+        if a.every <= 0:
+            return 0 if best is not None else 1
+        time.sleep(a.every)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
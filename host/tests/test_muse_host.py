@@ -0,0 +1,217 @@
+# test_muse_host.py
+# Commentarii Latine: probationes contra machinas fictas in UDP locali.
+import asyncio
+import math
+
+import numpy as np
+
+from muse_host import MuseClient, TelemetryRing, binframe, parse_datagram, standin
+from muse_host.protocol import BIN_PREFIX, encode_line
+from muse_host.ring import COL
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _client_and_standins(nodes=1, rate_hz=200.0):
+    client = MuseClient()
+    port = (await client.listen_udp("127.0.0.1", 0))[1]
+    devs = await standin.start(("127.0.0.1", port), rate_hz, nodes)
+    return client, devs
+
+
+def _close(client, devs):
+    client.close()
+    for d in devs:
+        d.transport.close()
+
+
+def _key(dev):
+    return dev.transport.get_extra_info("sockname")[:2]
+
+
+async def _settle():
+    await asyncio.sleep(0.1)
+
+
+def test_received_equals_sent_over_nodes():
+    async def go():
+        client, devs = await _client_and_standins(nodes=4, rate_hz=300)
+        try:
+            await asyncio.gather(*(d.run(0.5) for d in devs))
+            await _settle()
+            assert len(client.devices) == 4
+            for d in devs:
+                dev = client.devices[_key(d)]
+                assert dev.messages == d.sent > 0
+                assert dev.duplicates == 0
+                assert len(dev.ring) == d.sent
+            assert client.rx_messages == sum(d.sent for d in devs)
+        finally:
+            _close(client, devs)
+
+    _run(go())
+
+
+def test_sync_returns_estimate():
+    async def go():
+        client, (dev,) = await _client_and_standins()
+        try:
+            best = await client.sync(_key(dev), rounds=4, apply=False)
+            assert best is not None
+            offset, rtt, at = best
+            assert rtt >= 0
+            assert isinstance(offset, int) and isinstance(at, int)
+        finally:
+            _close(client, [dev])
+
+    _run(go())
+
+
+def test_binary_frames_decode_and_dedupe():
+    async def go():
+        client, (dev,) = await _client_and_standins(rate_hz=200)
+        try:
+            client.send(_key(dev), {"cmd": "bin", "on": 1})
+            await _settle()
+            await dev.run(0.5)
+            await _settle()
+            d = client.devices[_key(dev)]
+            # broadcast line + unicast frame per sample, stored once
+            assert d.messages == dev.sent
+            assert d.duplicates == dev.sent
+            ts = d.ring.last()[:, COL["ts_ms"]]
+            assert len(np.unique(ts)) == len(ts)
+        finally:
+            _close(client, [dev])
+
+    _run(go())
+
+
+def test_batched_datagrams():
+    async def go():
+        client, (dev,) = await _client_and_standins(rate_hz=500)
+        try:
+            client.send(_key(dev), {"cmd": "batch", "on": 1})
+            await _settle()
+            await dev.run(0.5)
+            await _settle()
+            d = client.devices[_key(dev)]
+            assert d.messages == dev.sent
+            assert d.duplicates == dev.sent
+            # plain copies: one datagram each; batched copies: several per datagram
+            assert client.rx_datagrams < 2 * dev.sent
+        finally:
+            _close(client, [dev])
+
+    _run(go())
+
+
+def test_binframe_roundtrip():
+    msg = standin.StandinDevice(None).sample()
+    out = binframe.decode(binframe.encode(msg))
+    assert out["ts_ms"] == msg["ts_ms"]
+    assert out["distance_mm"] == msg["distance_mm"]
+    assert math.isclose(out["tilt"]["pitch_rad"], msg["tilt"]["pitch_rad"], abs_tol=1e-4)
+    assert math.isclose(out["temp_c"], msg["temp_c"], abs_tol=0.01)
+
+
+def test_parse_datagram_noise_broken_batched():
+    good = encode_line({"type": "button", "ts_ms": 1})
+    assert parse_datagram(good) == [{"type": "button", "ts_ms": 1}]
+    assert parse_datagram(b"ets Jun  8 2016 00:22:57\r\n") == []
+    assert parse_datagram(b"  " + good + b"\r\n") == [{"type": "button", "ts_ms": 1}]
+
+    errors = []
+    assert parse_datagram(b"@MUSE#J={broken", errors) == []
+    assert len(errors) == 1
+
+    errors = []
+    batch = b"\n".join((good, b"noise", b"@MUSE#J={", encode_line({"type": "x", "ts_ms": 2}))) + b"\n"
+    assert parse_datagram(batch, errors) == [{"type": "button", "ts_ms": 1}, {"type": "x", "ts_ms": 2}]
+    assert len(errors) == 1
+
+    errors = []
+    assert parse_datagram(BIN_PREFIX + b"\x01", errors) == []
+    assert len(errors) == 1
+
+
+def test_ring_last_wraparound():
+    ring = TelemetryRing(4)
+    for i in range(10):
+        ring.append({"type": "sensor", "ts_ms": i, "distance_mm": 100 + i}, float(i))
+    assert len(ring) == 4 and ring.total == 10
+    assert list(ring.last()[:, COL["ts_ms"]]) == [6, 7, 8, 9]
+    assert list(ring.last(3)[:, COL["dist0_mm"]]) == [107, 108, 109]
+    assert ring.last(0).shape == (0, ring.data.shape[1])
+    assert len(ring.last(100)) == 4
+
+
+def _sensor(ts, **extra):
+    msg = {"type": "sensor", "ts_ms": ts, "distance_mm": 400 + ts % 100}
+    msg.update(extra)
+    return msg
+
+
+def test_dedupe_batch_larger_than_old_window():
+    # Per-line broadcast first, the same lines again in one batched datagram.
+    client = MuseClient()
+    key = ("10.0.0.9", 7777)
+    lines = [encode_line(_sensor(1000 + i * 5)) for i in range(40)]
+    for line in lines:
+        client.feed(line, key)
+    client.feed(b"\n".join(lines) + b"\n", key)
+    dev = client.devices[key]
+    assert dev.messages == 40
+    assert dev.duplicates == 40
+    assert len(dev.ring) == 40
+
+
+def test_dedupe_window_and_restart():
+    from muse_host.device import DEDUPE_MS, TS_PERIOD
+
+    client = MuseClient()
+    key = ("10.0.0.9", 7777)
+    # across the ticks_ms wrap
+    for ts in (TS_PERIOD - 10, TS_PERIOD - 5, 0, 5):
+        client.feed(encode_line(_sensor(ts)), key)
+        client.feed(encode_line(_sensor(ts)), key)
+    dev = client.devices[key]
+    assert (dev.messages, dev.duplicates) == (4, 4)
+    # old keys are forgotten after DEDUPE_MS of device time
+    for ts in range(10, 3 * DEDUPE_MS, 100):
+        client.feed(encode_line(_sensor(ts)), key)
+    assert len(dev._recent) <= 2 * DEDUPE_MS // 100 + 1
+    # restart: ts_ms starts over, nothing is taken for a duplicate
+    before = dev.messages
+    for ts in (0, 5, 10):
+        client.feed(encode_line(_sensor(ts)), key)
+    assert dev.messages == before + 3
+    # distinct non-sensor events in one ms are kept, identical ones dropped
+    client.feed(encode_line({"type": "button", "ts_ms": 11, "event": "down"}), key)
+    client.feed(encode_line({"type": "button", "ts_ms": 11, "event": "up"}), key)
+    client.feed(encode_line({"type": "button", "ts_ms": 11, "event": "up"}), key)
+    assert dev.messages == before + 5
+
+
+def test_dedupe_prefers_ndjson_over_binary_frame():
+    client = MuseClient()
+    key = ("10.0.0.9", 7777)
+    full = standin.StandinDevice(None).sample()
+    full["imu_win"] = {"n": 4}
+    # frame first (unicast beat the DTIM-held broadcast), then the line
+    client.feed(binframe.encode(full), key, rx_time=1.0)
+    client.feed(encode_line(full), key, rx_time=1.2)
+    dev = client.devices[key]
+    assert (dev.messages, dev.duplicates, dev.upgraded) == (1, 1, 1)
+    assert dev.sensor == full
+    row = dev.ring.last()[0]
+    assert row[COL["pitch_rad"]] == full["tilt"]["pitch_rad"]
+    assert row[COL["rx_time"]] == 1.0
+    # line first: the later frame changes nothing
+    full2 = dict(full, ts_ms=full["ts_ms"] + 1)
+    client.feed(encode_line(full2), key)
+    client.feed(binframe.encode(full2), key)
+    assert dev.sensor == full2
+    assert (dev.messages, dev.duplicates, dev.upgraded) == (2, 2, 1)
@@ -0,0 +1,116 @@
+# test_recording.py
+# Commentarii Latine: probationes tabulae: scribere, legere, quaerere, truncare, reddere.
+import os
+import socket
+
+import pytest
+
+from muse_host.protocol import encode_line
+from muse_host.recording import INDEX_EVERY_US, Recording, RecordWriter, replay
+
+A = ("10.0.0.5", 7777)
+B = "/dev/ttyUSB0"
+
+
+def _line(i):
+    return encode_line({"type": "sensor", "ts_ms": i, "distance_mm": 400 + i})
+
+
+def _write(path, n=50, step_us=100_000, close=True):
+    # n records, alternating sources, every step_us; returns what was written.
+    w = RecordWriter(str(path), start_us=1_700_000_000_000_000)
+    rows = []
+    for i in range(n):
+        src = A if i % 2 == 0 else B
+        w.write(_line(i), src, t_us=i * step_us)
+        rows.append((i * step_us, 0 if i % 2 == 0 else 1, _line(i)))
+    if close:
+        w.close()
+    else:
+        w._f.close()   # as if killed: records on disk, no index/footer
+        w._f = None
+    return rows
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "s.mrec"
+    rows = _write(path)
+    rec = Recording(str(path))
+    assert rec.start_us == 1_700_000_000_000_000
+    assert rec.sources == {0: "10.0.0.5:7777", 1: B}
+    assert rec.count == len(rows)
+    assert rec.duration_us == rows[-1][0]
+    assert list(rec.records()) == rows
+    # 4.9 s of records, one seek point per second
+    assert len(rec.index) == rows[-1][0] // INDEX_EVERY_US + 1
+
+
+def test_seek_bounds(tmp_path):
+    path = tmp_path / "s.mrec"
+    rows = _write(path)
+    rec = Recording(str(path))
+    got = list(rec.records(1_000_000, 2_000_000))
+    assert [t for t, _, _ in got] == [t for t, _, _ in rows if 1_000_000 <= t <= 2_000_000]
+    got = list(rec.records(1_050_000, 1_250_000))   # between records and index points
+    assert [t for t, _, _ in got] == [1_100_000, 1_200_000]
+    assert list(rec.records(10_000_000)) == []
+    assert list(rec.records(0, 0)) == rows[:1]
+
+
+def test_truncated_without_footer(tmp_path):
+    path = tmp_path / "s.mrec"
+    rows = _write(path, close=False)   # recorder killed: no index, no footer
+    rec = Recording(str(path))
+    assert rec.count == len(rows)
+    assert list(rec.records()) == rows
+    assert [t for t, _, _ in rec.records(2_000_000, 2_100_000)] == [2_000_000, 2_100_000]
+    assert len(rec.index) == 5   # rebuilt by the scan
+
+
+def test_truncated_partial_last_record(tmp_path):
+    path = tmp_path / "s.mrec"
+    rows = _write(path, close=False)
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size - 5)   # cut into the last record's bytes
+    rec = Recording(str(path))
+    assert rec.count == len(rows) - 1
+    assert list(rec.records()) == rows[:-1]
+    with open(path, "r+b") as f:
+        f.truncate(size - len(rows[-1][2]) - 6)   # cut into its header
+    assert list(Recording(str(path)).records()) == rows[:-1]
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "x.mrec"
+    path.write_bytes(b"NOTMUSE!" + bytes(8))
+    with pytest.raises(ValueError):
+        Recording(str(path))
+
+
+def test_replay_max_speed_delivers_every_record(tmp_path):
+    path = tmp_path / "s.mrec"
+    rows = _write(path, n=200, step_us=10_000)
+    rec = Recording(str(path))
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    rx.bind(("127.0.0.1", 0))
+    rx.settimeout(1.0)
+    try:
+        sent, dt, lag = replay(rec, rx.getsockname(), speed=0, bind="127.0.0.1")
+        assert sent == len(rows)
+        got = []
+        senders = {}
+        for _ in range(sent):
+            data, addr = rx.recvfrom(2048)
+            got.append(data)
+            senders.setdefault(addr, set()).add(data)
+    finally:
+        rx.close()
+    assert got == [d for _, _, d in rows]
+    # one socket per recorded source
+    assert len(senders) == 2
+    assert {frozenset(v) for v in senders.values()} == {
+        frozenset(d for _, s, d in rows if s == 0),
+        frozenset(d for _, s, d in rows if s == 1),
+    }